@@ -0,0 +1,159 @@
+"""Task analytics: completion and priority/tag distributions per user.
+
+Counts come from ``user_task_stats``, which triggers on ``tasks`` keep in
+step with every write, so the analytics tab is one primary-key range read.
+With ``ANALYTICS_MATERIALIZED=0`` they are computed from the tasks table
+instead, in a single grouped pass over a covering index.
+
+``find_drift`` recomputes everything from scratch and lists where the
+materialized counts disagree; ``flask check-task-stats`` runs it.
+
+Trends over time are read from the ``task_daily_stats`` rollup (per user,
+day and tag), never from the tasks table; ``flask backfill-rollups``
+rebuilds it.
+"""
+import os
+from collections import namedtuple
+from datetime import date, timedelta
+
+import db
+
+ANALYTICS_MATERIALIZED = os.environ.get('ANALYTICS_MATERIALIZED', '1') == '1'
+
+# One counter: kind is 'all' (value ''), 'priority' or 'tag'
+StatRow = namedtuple('StatRow', ['kind', 'value', 'total', 'completed'])
+Drift = namedtuple('Drift', ['user_id', 'kind', 'value', 'expected', 'actual'])
+
+TIMESERIES_GRANULARITIES = ('day', 'week')
+TIMESERIES_MEASURES = ('created', 'completed', 'hours_planned', 'hours_completed')
+
+
+def scan_stats(conn, user_id):
+    """Counters computed from the user's tasks in one pass."""
+    rows = conn.execute('''
+        SELECT IFNULL(priority, '') AS priority, IFNULL(tag, '') AS tag,
+               COUNT(*) AS total, SUM(IFNULL(completed, 0) = 1) AS completed
+        FROM tasks
+        WHERE user_id = ?
+        GROUP BY priority, tag
+    ''', (user_id,)).fetchall()
+
+    counts = {}
+    for row in rows:
+        for key in (('all', ''), ('priority', row['priority']), ('tag', row['tag'])):
+            total, completed = counts.get(key, (0, 0))
+            counts[key] = (total + row['total'], completed + row['completed'])
+    return [StatRow(kind, value, total, completed) for (kind, value), (total, completed) in counts.items()]
+
+
+def materialized_stats(conn, user_id):
+    """Counters as maintained by the triggers."""
+    rows = conn.execute('''
+        SELECT kind, value, total, completed FROM user_task_stats
+        WHERE user_id = ? AND total > 0
+    ''', (user_id,)).fetchall()
+    return [StatRow(*row) for row in rows]
+
+
+def get_user_analytics(conn, user_id, materialized=ANALYTICS_MATERIALIZED):
+    """The ``analytics`` payload of GET /api/analytics."""
+    rows = materialized_stats(conn, user_id) if materialized else scan_stats(conn, user_id)
+
+    total_tasks = completed_tasks = 0
+    distributions = {'priority': [], 'tag': []}
+    for row in sorted(rows, key=lambda r: (r.kind, r.value)):
+        if row.kind == 'all':
+            total_tasks, completed_tasks = row.total, row.completed
+        else:
+            distributions[row.kind].append({row.kind: row.value or None, 'count': row.total})
+
+    return {
+        "completion_rate": 0 if total_tasks == 0 else round((completed_tasks / total_tasks) * 100),
+        "priority_distribution": distributions['priority'],
+        "tag_distribution": distributions['tag'],
+        "total_tasks": total_tasks,
+        "completed_tasks": completed_tasks
+    }
+
+
+def find_drift(conn):
+    """Materialized counters that differ from a full recount, for all users."""
+    expected = {}
+    user_ids = [row[0] for row in conn.execute('SELECT DISTINCT user_id FROM tasks WHERE user_id IS NOT NULL')]
+    for user_id in user_ids:
+        for row in scan_stats(conn, user_id):
+            expected[(user_id, row.kind, row.value)] = (row.total, row.completed)
+
+    actual = {
+        (row['user_id'], row['kind'], row['value']): (row['total'], row['completed'])
+        for row in conn.execute('SELECT * FROM user_task_stats WHERE total != 0 OR completed != 0')
+    }
+
+    drift = []
+    for key in sorted(expected.keys() | actual.keys(), key=str):
+        if expected.get(key, (0, 0)) != actual.get(key, (0, 0)):
+            drift.append(Drift(*key, expected.get(key, (0, 0)), actual.get(key, (0, 0))))
+    return drift
+
+
+def repair(conn):
+    """Rebuild the materialized counters from the tasks table."""
+    db.rebuild_task_stats(conn)
+    conn.commit()
+
+
+def _period_start(day, granularity):
+    # Weeks start on Monday
+    return day - timedelta(days=day.weekday()) if granularity == 'week' else day
+
+
+def timeseries(conn, user_id, start, end, granularity='day'):
+    """Created/completed counts and planned/completed hours per period.
+
+    Every period between ``start`` and ``end`` (dates, inclusive) appears,
+    with zeros where nothing happened, so the arrays line up for charting.
+    ``start`` is widened to the beginning of its week so no bucket is
+    partial. ``tags`` breaks created and completed counts down per tag.
+    """
+    step = timedelta(days=7 if granularity == 'week' else 1)
+    start = _period_start(start, granularity)
+    periods = []
+    period = start
+    while period <= end:
+        periods.append(period.isoformat())
+        period += step
+    index = {period: i for i, period in enumerate(periods)}
+
+    series = {measure: [0] * len(periods) for measure in TIMESERIES_MEASURES}
+    tags = {}
+    rows = conn.execute('''
+        SELECT day, tag, created, completed, hours_planned, hours_completed
+        FROM task_daily_stats
+        WHERE user_id = ? AND day BETWEEN ? AND ?
+    ''', (user_id, start.isoformat(), end.isoformat())).fetchall()
+    for row in rows:
+        day = date.fromisoformat(row['day'])
+        i = index[_period_start(day, granularity).isoformat()]
+        for measure in TIMESERIES_MEASURES:
+            series[measure][i] += row[measure]
+        tag = tags.setdefault(row['tag'] or 'OTHER', {'created': [0] * len(periods), 'completed': [0] * len(periods)})
+        tag['created'][i] += row['created']
+        tag['completed'][i] += row['completed']
+
+    for measure in ('hours_planned', 'hours_completed'):
+        series[measure] = [round(float(hours), 2) for hours in series[measure]]
+
+    return {
+        "granularity": granularity,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "periods": periods,
+        "series": series,
+        "tags": tags
+    }
+
+
+def backfill(conn):
+    """Rebuild the daily rollup from the tasks table."""
+    db.rebuild_daily_rollups(conn)
+    conn.commit()
@@ -1,18 +1,40 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for
 import sqlite3
 from langchain_core.output_parsers import JsonOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.exceptions import OutputParserException
 from flask_cors import CORS
 from typing import Optional, List
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
 import ast
+import base64
+import functools
+import hashlib
 import json
 import re
 import os
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, date, timedelta
+import calendar
+import click
 import uuid
 
+import analytics
+import db
+import jobs
+import metrics
+import summary_cache
+import task_search
+from llm_cache import LLMCache
+from llm_exec import run_concurrently, DeadlineExceeded, LLM_BATCH_CONCURRENCY
+from intent_classifier import IntentClassifier, INTENT_CLASSIFIER_SHADOW, record_shadow
+from date_parser import parse_schedule
+from llm_provider import make_llm
+from llm_resilience import ResilientLLM, LLMUnavailable
+from title_resolver import TitleResolver
+from transcript_splitter import split_transcript, VOICE_BATCH_MAX_NOTES
+from db import get_db_connection, get_read_connection, iso_date
+
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -22,61 +44,202 @@ app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "development-secret-key")
 CORS(app)
 
-# Google Gemini API setup
+# Google Gemini API setup; LLM_PROVIDER switches to record/replay/stub.
+# Calls get a deadline by kind, retries, a circuit breaker and a bulkhead.
 api_key = os.getenv("GOOGLE_API_KEY", "<API_KEY>")
-llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", google_api_key=api_key)
+llm = ResilientLLM(make_llm(api_key))
+
+# Cached LLM responses. Bump a template's version whenever its prompt text
+# changes so answers produced by the old wording are not reused.
+llm_cache = LLMCache()
+PROMPT_VERSIONS = {
+    'classify_voice': 1,
+    'classify_assistant': 1,
+    'extract_task': 1,
+    'extract_task_core': 1,
+    'extract_title': 1,
+    'parse_update': 1,
+    'identify_review_target': 1,
+    'classify_extract_voice': 1,
+    'classify_extract_assistant': 1,
+    'task_summary': 1,
+}
+# Deadline class of each template's calls (see llm_resilience.LLM_DEADLINES).
+# Voice and assistant requests wait on 'classify' (local classifier misses,
+# title extraction) or 'classify_extract' (the combined prompt), so those are
+# the kinds to hedge: LLM_HEDGE_KINDS=classify,classify_extract.
+PROMPT_KINDS = {
+    'classify_voice': 'classify',
+    'classify_assistant': 'classify',
+    'extract_title': 'classify',
+    'extract_task': 'extract',
+    'extract_task_core': 'extract',
+    'parse_update': 'extract',
+    'identify_review_target': 'extract',
+    'classify_extract_voice': 'classify_extract',
+    'classify_extract_assistant': 'classify_extract',
+    'task_summary': 'summary',
+}
+# Check each template's answer must pass before it is cached (see
+# llm_cache.cacheable); it mirrors how the caller reads the answer, so an
+# answer the caller would reject is never served again from the cache
+PROMPT_VALIDATORS = {
+    'classify_voice': lambda response: response.content.strip().upper() in VOICE_INTENTS,
+    'classify_assistant': lambda response: response.content.strip().upper() in ASSISTANT_INTENTS,
+    'extract_title': lambda response: response.content.strip(),
+    'extract_task': lambda response: extract_json_from_llm_response(response),
+    'extract_task_core': lambda response: extract_json_from_llm_response(response),
+    'parse_update': lambda response: extract_json_from_llm_response(response),
+    'identify_review_target': lambda response: extract_json_from_llm_response(response),
+    'classify_extract_voice': lambda response: VoiceCommand.model_validate(
+        JsonOutputParser().parse(response.content), context={'labels': VOICE_INTENTS}),
+    'classify_extract_assistant': lambda response: VoiceCommand.model_validate(
+        JsonOutputParser().parse(response.content), context={'labels': ASSISTANT_INTENTS}),
+}
+
+# Fuzzy matching of LLM-extracted titles to stored tasks, per user
+title_resolver = TitleResolver()
+
+def invoke_cached(prompt, template, volatile=()):
+    """Call the LLM through the response cache.
+
+    Pass any date/time strings embedded in the prompt as ``volatile`` so the
+    cached answer is reused for the rest of the day but not beyond it.
+    """
+    kind_llm = llm.for_kind(PROMPT_KINDS[template])
+    return llm_cache.invoke(kind_llm, prompt, template, PROMPT_VERSIONS[template], volatile,
+                            validate=PROMPT_VALIDATORS.get(template), deadline=kind_llm.deadline)
 
 # Database setup
-DATABASE = 'tasks.db'
-
-def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+db.init_app(app)
 
 def init_db():
     try:
-        conn = sqlite3.connect(DATABASE)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        # Create users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL
-            )
-        ''')
-
-        # Create tasks table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                task_title TEXT NOT NULL,
-                description TEXT,
-                priority TEXT DEFAULT 'Medium',
-                time_required TEXT,
-                schedule_date TEXT,
-                schedule_from TEXT,
-                schedule_to TEXT,
-                tag TEXT DEFAULT 'OTHER',
-                review TEXT,
-                completed INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-
-        conn.commit()
-        conn.close()
+        db.migrate()
     except Exception as e:
         logger.error(f"Error initializing database: {e}")
 
 # Initialize database
 init_db()
 
+@app.cli.command('check-task-stats')
+@click.option('--repair', is_flag=True, help='Rebuild the counters if any drifted.')
+def check_task_stats(repair):
+    """Compare the materialized analytics counters with a full recount."""
+    conn = db.open_connection()
+    try:
+        drift = analytics.find_drift(conn)
+        for item in drift:
+            click.echo(f"user {item.user_id} {item.kind}={item.value!r}: "
+                       f"expected total/completed {item.expected}, stored {item.actual}")
+        click.echo(f"{len(drift)} drifted counter(s)")
+        if drift and repair:
+            analytics.repair(conn)
+            click.echo("Counters rebuilt")
+    finally:
+        conn.close()
+
+@app.cli.command('backfill-rollups')
+def backfill_rollups():
+    """Rebuild the daily analytics rollup from all existing tasks."""
+    conn = db.open_connection()
+    try:
+        analytics.backfill(conn)
+        count = conn.execute('SELECT COUNT(*) FROM task_daily_stats').fetchone()[0]
+        click.echo(f"Rebuilt {count} daily rollup row(s)")
+    finally:
+        conn.close()
+
+@app.cli.command('run-jobs')
+@click.option('--workers', default=4, show_default=True, help='Worker threads to run.')
+def run_jobs(workers):
+    """Run background job workers in the foreground until interrupted.
+
+    For running the jobs outside the web processes (set JOB_WORKERS=0 there).
+    """
+    click.echo(f"Running {workers} job worker(s)")
+    jobs.serve(workers)
+
+@app.errorhandler(DeadlineExceeded)
+def handle_llm_deadline(e):
+    logger.error(f"LLM deadline exceeded: {e}")
+    return jsonify({
+        "success": False,
+        "message": "The assistant took too long to respond. Please try again."
+    }), 504
+
+@app.errorhandler(LLMUnavailable)
+def handle_llm_unavailable(e):
+    logger.error(f"LLM unavailable: {e}")
+    response = jsonify({
+        "success": False,
+        "message": "The assistant is temporarily unavailable. Please try again shortly."
+    })
+    response.status_code = 503
+    if e.retry_after:
+        response.headers['Retry-After'] = str(int(e.retry_after))
+    return response
+
+def respond_async():
+    """Whether the client takes a 202 job for slow LLM work.
+
+    Opt-in with ``Prefer: respond-async`` (RFC 7240) or ``?async=1``;
+    other clients get the result in the response as before.
+    """
+    prefer = [token.strip().lower() for token in request.headers.get('Prefer', '').split(',')]
+    return 'respond-async' in prefer or request.args.get('async') in ('1', 'true')
+
+def job_accepted(job):
+    """202 Accepted for a queued job; clients poll ``status_url``."""
+    status_url = url_for('get_job', job_id=job['id'])
+    response = jsonify({
+        "success": True,
+        "job_id": job['id'],
+        "status": job['status'],
+        "status_url": status_url
+    })
+    response.status_code = 202
+    response.headers['Location'] = status_url
+    response.headers['Preference-Applied'] = 'respond-async'
+    return response
+
+def conditional_on_version(per_day=False):
+    """Answer If-None-Match with 304 while the user's data is unchanged.
+
+    The strong ETag covers the user's change_seq (bumped by every task
+    write), the endpoint and its query string, plus today's date when
+    ``per_day`` is set. Checking it costs one primary-key lookup in
+    user_sync_state, so a 304 never reads the tasks table.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if 'user_id' not in session:
+                return view(*args, **kwargs)
+
+            user_id = session['user_id']
+            version = db.current_change_seq(get_read_connection(), user_id)
+            parts = [request.endpoint, str(user_id), str(version), *sorted(f"{k}={v}" for k, v in request.args.items(multi=True))]
+            if per_day:
+                parts.append(date.today().isoformat())
+            etag = hashlib.sha256("\n".join(parts).encode('utf-8')).hexdigest()[:32]
+
+            if request.if_none_match.contains(etag):
+                metrics.incr(f'etag.{request.endpoint}.not_modified')
+                response = app.response_class(status=304)
+            else:
+                response = app.make_response(view(*args, **kwargs))
+                # no-store marks a body that must not be revalidated later,
+                # e.g. a stale summary while a fresh one is being generated
+                if response.status_code != 200 or 'no-store' in response.headers.get('Cache-Control', ''):
+                    return response
+            response.set_etag(etag)
+            # Let the browser keep the body but revalidate on every request
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
 # Helper function to validate task data
 def validate_task(task_data):
     warnings = []
@@ -159,11 +322,79 @@ def extract_json_from_llm_response(response):
         logger.error(f"Error decoding JSON: {e}")
         return {}
 
-def extract_task_details(text_input):
-    """Calls Google Gemini API to extract structured task details from text."""
-    now = datetime.now()
+# Leading words of a plain "add X" note, and priority words, removed from
+# the locally built task title
+_CREATE_LEAD = re.compile(
+    r"^(?:(?:please|hey|ok|okay)[\s,]+)*"
+    r"(?:(?:add|create|schedule|plan|set up|arrange|book|put|note down|remind me to|make)\s+)?"
+    r"(?:an?\s+)?(?:(?:new\s+)?task\s+(?:to|for|called)\s+)?",
+    re.IGNORECASE
+)
+_PRIORITY_WORDS = re.compile(r"\b(?:(high|medium|low)\s+priority|(urgent|important))\b", re.IGNORECASE)
+PLAIN_TITLE_MAX_WORDS = 6
+
+def plain_task_details(text_input, schedule):
+    """Build task details without the LLM for a plain scheduling command.
+
+    Only applies when the scheduling fields are fully resolved and what is
+    left of the note is a short title ("gym tomorrow 5-6pm"). Returns None
+    for anything that needs the LLM to interpret it.
+    """
+    if voice_classifier.classify(text_input).label not in (None, 'CREATE_TASK'):
+        return None
+
+    title = schedule.remainder
+    title = title[_CREATE_LEAD.match(title).end():]
+    priority = "Medium"
+    match = _PRIORITY_WORDS.search(title)
+    if match:
+        priority = (match.group(1) or "High").capitalize()
+        title = _PRIORITY_WORDS.sub("", title)
+    title = re.sub(r"\s+", " ", title).strip(" ,.;")
+
+    if not title or len(title.split()) > PLAIN_TITLE_MAX_WORDS or re.search(r"[,;:]|\b(?:and|then|but)\b", title, re.IGNORECASE):
+        return None
+
+    return {
+        'task_title': title[0].upper() + title[1:],
+        'description': text_input.strip(),
+        **schedule.fields(),
+        'tag': "OTHER",
+        'priority': priority,
+    }
+
+def plan_task_extraction(text_input, now=None):
+    """Resolve what can be resolved without the LLM.
+
+    Returns ``(task_data, call)``. When ``call`` is None, ``task_data`` is
+    the finished result. Otherwise ``call`` is the ``(prompt, template,
+    volatile)`` still to send to the LLM, and finish_task_extraction merges
+    its answer with ``task_data``.
+    """
+    now = now or datetime.now()
     formatted_now = now.strftime("%A, %d %B %Y, %H:%M")
 
+    schedule = parse_schedule(text_input, now)
+    if schedule.complete:
+        task_data = plain_task_details(text_input, schedule)
+        if task_data is not None:
+            metrics.incr('extract_task.local_only')
+            return task_data, None
+
+        metrics.incr('extract_task.reduced_prompt')
+        prompt = f"""
+        Parse the following text and classify it into attributes:
+        - task_title (generate one from the info if not explicitly provided)
+        - description (generate one from the info if not explicitly provided)
+        - tag (one per task, uppercase, default 'OTHER')
+        - priority (default 'Medium', can only hold High, Medium and Low values)
+
+        Text: {text_input}
+        And create a JSON type output with these attributes as keys. If you are not able to extract an attribute, fill "F" as the value
+    """
+        return schedule.fields(), (prompt, 'extract_task_core', ())
+
+    metrics.incr('extract_task.full_prompt')
     prompt = f"""
         Parse the following text and classify it into attributes:
         - task_title (generate one from the info if not explicitly provided)
@@ -178,9 +409,147 @@ def extract_task_details(text_input):
         Text: {text_input}
         And create a JSON type output with these attributes as keys. If you are not able to extract an attribute, fill "F" as the value
     """
+    return {}, (prompt, 'extract_task', (formatted_now,))
+
+def finish_task_extraction(response, task_data):
+    """Task details from the LLM's answer; locally resolved fields win."""
+    return {**extract_json_from_llm_response(response), **task_data}
+
+def extract_task_details(text_input):
+    """Calls Google Gemini API to extract structured task details from text.
 
-    response = llm.invoke(prompt)
-    return extract_json_from_llm_response(response)
+    Scheduling fields are resolved locally first. When that succeeds the LLM
+    only fills in title, description, tag and priority, and a plain
+    scheduling command needs no LLM call at all.
+    """
+    task_data, call = plan_task_extraction(text_input)
+    if call is None:
+        return task_data
+    prompt, template, volatile = call
+    return finish_task_extraction(invoke_cached(prompt, template, volatile), task_data)
+
+# Intent labels with example action verbs, used in the classification prompts
+VOICE_INTENTS = {
+    'CREATE_TASK': "create,add (new),schedule,plan,set up,arrange,assign,make a task,put on calendar,log (new task),add to list,note down,draft,prepare (task).",
+    'UPDATE_TASK': "update,modify,change,edit,reschedule,shift,move,postpone,advance (earlier),delay,rename,adjust,revise,reprioritize.",
+    'ADD_REVIEW': "add review, summarize,attach summary,add notes, attach a note, note what happened, log outcome,add feedback,leave comments, record what was done,write review,provide recap, summarize result, jot down reflection, add summary to task.",
+}
+ASSISTANT_INTENTS = {
+    'CREATE_TASK': "",
+    'MODIFY_TASK': "",
+    'ADD_REVIEW': "",
+}
+
+# Phrases that contradict a leading "add"/"create": a note or review for a
+# task, marking one, or naming an existing task ("the gym task")
+_EXISTING_TASK_CUE = r"\b(?:the|my|that|this)\s+(?:[\w'-]+\s+){0,3}task\b"
+VOICE_CUES = {
+    'UPDATE_TASK': [r"\bmark(?:ed)?\s+(?:it|the|my|this|that|as)\b", _EXISTING_TASK_CUE],
+    'ADD_REVIEW': [r"\b(?:notes?|comments?|review|feedback|recap)\s+(?:to|on|for|about)\b"],
+}
+
+# Local fast path for the classification step; the assistant's MODIFY_TASK
+# covers the same verbs as UPDATE_TASK
+voice_classifier = IntentClassifier(VOICE_INTENTS, VOICE_CUES)
+assistant_classifier = IntentClassifier({
+    'CREATE_TASK': VOICE_INTENTS['CREATE_TASK'],
+    'MODIFY_TASK': VOICE_INTENTS['UPDATE_TASK'],
+    'ADD_REVIEW': VOICE_INTENTS['ADD_REVIEW'],
+}, {
+    'MODIFY_TASK': VOICE_CUES['UPDATE_TASK'],
+    'ADD_REVIEW': VOICE_CUES['ADD_REVIEW'],
+})
+
+class VoiceCommand(BaseModel):
+    """Intent and task attributes returned by the combined prompt.
+
+    For CREATE_TASK the attributes describe the new task; for the other
+    intents task_title (and schedule_date, if given) identify the existing
+    task the input refers to.
+    """
+    intent: str
+    task_title: str = Field(default="F")
+    description: str = Field(default="F")
+    time_required: str = Field(default="F")
+    schedule_date: str = Field(default="F")
+    schedule_from: str = Field(default="F")
+    schedule_to: str = Field(default="F")
+    tag: str = Field(default="OTHER")
+    priority: str = Field(default="Medium")
+
+    @field_validator('*', mode='before')
+    @classmethod
+    def _as_text(cls, value):
+        return "F" if value is None else str(value).strip()
+
+    @field_validator('intent')
+    @classmethod
+    def _known_intent(cls, value, info):
+        value = value.upper()
+        labels = (info.context or {}).get('labels')
+        if labels and value not in labels:
+            raise ValueError(f"unknown intent {value}")
+        return value
+
+    @model_validator(mode='after')
+    def _has_title(self):
+        if self.task_title in ("", "F"):
+            raise ValueError("task_title is missing")
+        return self
+
+    def task_data(self):
+        return self.model_dump(exclude={'intent'})
+
+def classify_and_extract(text_input, intents, template):
+    """Classify the intent and extract task details with one LLM call.
+
+    Returns a VoiceCommand, or None when the response does not validate so
+    the caller can fall back to separate classification/extraction calls.
+    As in plan_task_extraction, scheduling fields the local parser fully
+    resolves are left out of the prompt and taken from the parser.
+    """
+    now = datetime.now()
+    formatted_now = now.strftime("%A, %d %B %Y, %H:%M")
+    categories = "\n".join(
+        f"        - {label}: {verbs}" if verbs else f"        - {label}"
+        for label, verbs in intents.items()
+    )
+
+    schedule = parse_schedule(text_input, now)
+    if schedule.complete:
+        metrics.incr('combined_prompt.schedule_resolved')
+        resolved, volatile, schedule_attributes = schedule.fields(), (), ""
+    else:
+        resolved, volatile = {}, [formatted_now]
+        schedule_attributes = f"""
+        - time_required (in decimal)
+        - schedule_date (DD/MM/YYYY), today is {formatted_now}
+        - schedule_from (HH:MM 24hr format)
+        - schedule_to (HH:MM 24hr format)"""
+
+    prompt = f"""
+        Classify the following text into one of these categories (example action verbs given where available):
+{categories}
+
+        Then parse the text into these attributes:
+        - task_title (for CREATE_TASK generate one from the info if not explicitly provided; otherwise the title of the existing task the text refers to)
+        - description (generate one from the info if not explicitly provided){schedule_attributes}
+        - tag (one per task, uppercase, default 'OTHER')
+        - priority (default 'Medium', can only hold High, Medium and Low values)
+
+        Text: {text_input}
+        Create a single JSON object with the key "intent" holding the category label and the attributes above as the other keys. If you are not able to extract an attribute, fill "F" as the value
+    """
+
+    metrics.incr('combined_prompt.calls')
+    try:
+        response = invoke_cached(prompt, template, volatile=volatile)
+        parsed = JsonOutputParser().parse(response.content)
+        return VoiceCommand.model_validate({**parsed, **resolved}, context={'labels': intents})
+    except (OutputParserException, ValidationError, TypeError) as e:
+        logger.debug(f"Combined prompt response rejected, falling back: {e}")
+        metrics.incr('combined_prompt.fallbacks')
+        return None
 
 # Routes
 @app.route('/')
@@ -196,9 +565,8 @@ def login():
         email = data.get('email')
         password = data.get('password')
 
-        conn = get_db_connection()
+        conn = get_read_connection()
         user = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
-        conn.close()
 
         if user and user['password'] == password:
             session['user_id'] = user['id']
@@ -223,13 +591,12 @@ def signup():
         conn.execute('INSERT INTO users (email, password) VALUES (?, ?)', (email, password))
         conn.commit()
         user_id = conn.execute('SELECT id FROM users WHERE email = ?', (email,)).fetchone()['id']
-        conn.close()
 
         session['user_id'] = user_id
         session['email'] = email
         return jsonify({"success": True})
     except sqlite3.IntegrityError:
-        conn.close()
+        conn.rollback()
         return jsonify({"success": False, "message": "Email already exists"})
 
 @app.route('/logout')
@@ -238,16 +605,167 @@ def logout():
     session.pop('email', None)
     return redirect(url_for('login'))
 
+# Columns a client may request with ?fields=
+TASK_FIELDS = [
+    'id', 'user_id', 'task_title', 'description', 'priority', 'time_required',
+    'schedule_date', 'schedule_iso', 'schedule_from', 'schedule_to', 'tag',
+    'review', 'completed', 'completed_at', 'created_at', 'updated_at', 'change_seq'
+]
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(task):
+    payload = json.dumps([task['created_at'], task['id']])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(cursor):
+    created_at, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return str(created_at), int(task_id)
+
+def parse_date_param(value):
+    """Accept DD/MM/YYYY (as stored) or YYYY-MM-DD; return ISO or None."""
+    return iso_date(value) or (value if re.fullmatch(r'\d{4}-\d{2}-\d{2}', value) else None)
+
 @app.route('/api/tasks', methods=['GET'])
+@conditional_on_version()
 def get_tasks():
+    """List the user's tasks, newest first.
+
+    Optional query parameters:
+    - limit / cursor: keyset pagination on (created_at, id); the response
+      carries next_cursor while more tasks remain
+    - fields: comma-separated columns to return (id is always included)
+    - completed: 0/1 filter
+    - from / to: schedule date window (DD/MM/YYYY or YYYY-MM-DD)
+
+    Without parameters the full list is returned as before.
+    """
     if 'user_id' not in session:
         return jsonify({"success": False, "message": "Unauthorized"}), 401
 
-    conn = get_db_connection()
-    tasks = conn.execute('SELECT * FROM tasks WHERE user_id = ? ORDER BY created_at DESC', 
-                         (session['user_id'],)).fetchall()
-    conn.close()
+    args = request.args
+    conditions = ['user_id = ?']
+    params = [session['user_id']]
+
+    columns = '*'
+    if args.get('fields'):
+        requested = [f.strip() for f in args['fields'].split(',') if f.strip()]
+        unknown = [f for f in requested if f not in TASK_FIELDS]
+        if unknown:
+            return jsonify({"success": False, "message": f"Unknown fields: {', '.join(unknown)}"}), 400
+        # Keyset pagination needs created_at and id from every row
+        selected = ['id'] + [f for f in requested if f != 'id']
+        if 'limit' in args and 'created_at' not in selected:
+            selected.append('created_at')
+        columns = ', '.join(selected)
+
+    if args.get('completed') is not None:
+        completed = args['completed'].lower()
+        if completed not in ('0', '1', 'true', 'false'):
+            return jsonify({"success": False, "message": "completed must be 0 or 1"}), 400
+        conditions.append('completed = ?')
+        params.append(1 if completed in ('1', 'true') else 0)
+
+    for name, operator in (('from', '>='), ('to', '<=')):
+        if args.get(name):
+            value = parse_date_param(args[name])
+            if value is None:
+                return jsonify({"success": False, "message": f"Invalid {name} date"}), 400
+            conditions.append(f'schedule_iso {operator} ?')
+            params.append(value)
+
+    limit = None
+    if 'limit' in args:
+        try:
+            limit = max(1, min(int(args['limit']), MAX_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"success": False, "message": "limit must be an integer"}), 400
+        if args.get('cursor'):
+            try:
+                conditions.append('(created_at, id) < (?, ?)')
+                params.extend(decode_cursor(args['cursor']))
+            except (ValueError, TypeError):
+                return jsonify({"success": False, "message": "Invalid cursor"}), 400
+
+    query = f'SELECT {columns} FROM tasks WHERE {" AND ".join(conditions)} ORDER BY created_at DESC, id DESC'
+    if limit is not None:
+        # One extra row tells us whether another page exists
+        query += ' LIMIT ?'
+        params.append(limit + 1)
+
+    conn = get_read_connection()
+    tasks = conn.execute(query, params).fetchall()
+
+    response = {"success": True}
+    if limit is not None:
+        has_more = len(tasks) > limit
+        tasks = tasks[:limit]
+        response["next_cursor"] = encode_cursor(tasks[-1]) if has_more else None
+    response["tasks"] = [dict(task) for task in tasks]
+    return jsonify(response)
+
+@app.route('/api/tasks/changes', methods=['GET'])
+def get_task_changes():
+    """Tasks created/updated and ids deleted after change ``since``.
+
+    ``version`` in the response is the value to pass as ``since`` next
+    time. since=0 (or omitted, or newer than the server's version) returns
+    the full list with ``full: true``.
+    """
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({"success": False, "message": "since must be an integer"}), 400
+
+    user_id = session['user_id']
+    conn = get_read_connection()
+    # One snapshot, so the version matches the rows returned
+    conn.execute('BEGIN')
+    try:
+        version = db.current_change_seq(conn, user_id)
+        # A version from the future (e.g. the database was reset) also resyncs
+        full = since <= 0 or since > version
+        if full:
+            since = 0
+        changed = conn.execute('SELECT * FROM tasks WHERE user_id = ? AND change_seq > ? ORDER BY change_seq',
+                               (user_id, since)).fetchall()
+        deleted = [] if full else conn.execute(
+            'SELECT task_id FROM task_tombstones WHERE user_id = ? AND change_seq > ? ORDER BY change_seq',
+            (user_id, since)).fetchall()
+    finally:
+        conn.commit()
+
+    return jsonify({
+        "success": True,
+        "full": full,
+        "version": version,
+        "changed": [dict(task) for task in changed],
+        "deleted": [row['task_id'] for row in deleted]
+    })
+
+@app.route('/api/tasks/search', methods=['GET'])
+@conditional_on_version()
+def search_tasks():
+    """Full-text search over task titles, descriptions and reviews.
+
+    Query parameters: q (required) and limit (default 20, at most 100).
+    Tasks come back best match first.
+    """
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"success": False, "message": "q is required"}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', task_search.SEARCH_DEFAULT_LIMIT)), 100))
+    except ValueError:
+        return jsonify({"success": False, "message": "limit must be an integer"}), 400
 
+    conn = get_read_connection()
+    tasks = task_search.search_tasks(conn, session['user_id'], query, limit=limit)
     return jsonify({
         "success": True,
         "tasks": [dict(task) for task in tasks]
@@ -300,11 +818,13 @@ def create_task():
     cursor = conn.cursor()
 
     try:
+        change_seq = db.next_change_seq(conn, session['user_id'])
         cursor.execute('''
             INSERT INTO tasks (
                 user_id, task_title, description, priority, time_required, 
-                schedule_date, schedule_from, schedule_to, tag
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                schedule_date, schedule_iso, schedule_from, schedule_to, tag,
+                updated_at, change_seq
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
         ''', (
             session['user_id'],
             task_data['task_title'],
@@ -312,15 +832,16 @@ def create_task():
             task_data.get('priority', 'Medium'),
             task_data.get('time_required', ''),
             task_data.get('schedule_date', ''),
+            iso_date(task_data.get('schedule_date', '')),
             task_data.get('schedule_from', ''),
             task_data.get('schedule_to', ''),
-            task_data.get('tag', 'OTHER')
+            task_data.get('tag', 'OTHER'),
+            change_seq
         ))
 
         conn.commit()
         task_id = cursor.lastrowid
         task = conn.execute('SELECT * FROM tasks WHERE id = ?', (task_id,)).fetchone()
-        conn.close()
 
         return jsonify({
             "success": True,
@@ -328,12 +849,186 @@ def create_task():
         })
 
     except Exception as e:
-        conn.close()
+        conn.rollback()
         return jsonify({
             "success": False,
             "message": f"Error creating task: {str(e)}"
         })
 
+MAX_BATCH_SIZE = 500
+BATCH_OPS = ('create', 'update', 'complete', 'delete')
+
+def batch_task_values(task_data):
+    """The editable columns of a create/update item, in SQL parameter order."""
+    return (
+        task_data['task_title'],
+        task_data.get('description', ''),
+        task_data.get('priority', 'Medium'),
+        task_data.get('time_required', ''),
+        task_data.get('schedule_date', ''),
+        iso_date(task_data.get('schedule_date', '')),
+        task_data.get('schedule_from', ''),
+        task_data.get('schedule_to', ''),
+        task_data.get('tag', 'OTHER'),
+    )
+
+def is_task_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+@app.route('/api/tasks/batch', methods=['POST'])
+def batch_tasks():
+    """Apply many task operations in one request and one transaction.
+
+    Body: {"operations": [...], "atomic": false}, each operation one of
+    {"op": "create", "task": {...}}, {"op": "update", "id": N, "task": {...}},
+    {"op": "complete", "id": N[, "completed": 0|1]} (toggles without
+    "completed") or {"op": "delete", "id": N}.
+
+    Every item is validated first. As in the single-task routes, a create
+    or update with validate_task warnings is not written; its result has
+    "status": "needs_confirmation" and the warnings, so it can be completed
+    and sent again. Valid items are then written with one executemany per
+    operation type and a single commit. ``results`` has one entry per
+    operation, in order. With "atomic": true nothing is written unless
+    every item is valid.
+    """
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    data = request.json or {}
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"success": False, "message": "operations must be a non-empty list"}), 400
+    if len(operations) > MAX_BATCH_SIZE:
+        return jsonify({"success": False, "message": f"At most {MAX_BATCH_SIZE} operations per batch"}), 400
+
+    user_id = session['user_id']
+    conn = get_db_connection()
+
+    ids = {op.get('id') for op in operations if isinstance(op, dict) and op.get('op') != 'create'}
+    ids = [task_id for task_id in ids if is_task_id(task_id)]
+    rows = conn.execute(f'SELECT id, completed FROM tasks WHERE user_id = ? AND id IN ({", ".join("?" * len(ids))})',
+                        [user_id, *ids]).fetchall()
+    owned = {row['id']: row['completed'] for row in rows}
+
+    # Validate everything before writing anything
+    results = []
+    planned = {op: [] for op in BATCH_OPS}
+    seen = set()
+    for index, op in enumerate(operations):
+        kind = op.get('op') if isinstance(op, dict) else None
+        result = {"index": index, "op": kind, "success": False}
+        results.append(result)
+        if kind not in BATCH_OPS:
+            result["message"] = f"op must be one of {', '.join(BATCH_OPS)}"
+            continue
+
+        if kind != 'create':
+            task_id = op.get('id')
+            result["id"] = task_id
+            # True == 1, so a bool id would otherwise match task 1
+            if not is_task_id(task_id) or task_id not in owned:
+                result["message"] = "Task not found or not authorized"
+                continue
+            if task_id in seen:
+                result["message"] = "Task appears more than once in the batch"
+                continue
+            seen.add(task_id)
+
+        if kind in ('create', 'update'):
+            task_data = op.get('task')
+            if not isinstance(task_data, dict) or not task_data.get('task_title'):
+                result["message"] = "Task title is required"
+                continue
+            is_valid, warnings = validate_task(task_data)
+            if warnings:
+                result.update(status="needs_confirmation", warnings=warnings)
+                continue
+            planned[kind].append((result, batch_task_values(task_data)))
+        elif kind == 'complete':
+            completed = op.get('completed')
+            if completed is None:
+                completed = 0 if owned[task_id] == 1 else 1
+            if completed not in (0, 1):
+                result["message"] = "completed must be 0 or 1"
+                continue
+            planned[kind].append((result, completed))
+        else:
+            planned[kind].append((result, None))
+
+    failed = [result for result in results if "message" in result or "warnings" in result]
+    if data.get('atomic') and failed:
+        return jsonify({
+            "success": False,
+            "message": "Batch rejected: some operations are invalid",
+            "results": results
+        }), 400
+
+    if not any(planned.values()):
+        return jsonify({"success": False, "message": "No valid operations", "results": results})
+
+    try:
+        change_seq = db.next_change_seq(conn, user_id)
+        creates = planned['create']
+        if creates:
+            conn.executemany('''
+                INSERT INTO tasks (
+                    task_title, description, priority, time_required,
+                    schedule_date, schedule_iso, schedule_from, schedule_to, tag,
+                    user_id, updated_at, change_seq
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
+            ''', [values + (user_id, change_seq) for _, values in creates])
+            # The write lock is held, so AUTOINCREMENT handed out consecutive ids
+            last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+            for offset, (result, _) in enumerate(creates):
+                result["id"] = last_id - len(creates) + 1 + offset
+        if planned['update']:
+            conn.executemany('''
+                UPDATE tasks SET
+                    task_title = ?, description = ?, priority = ?, time_required = ?,
+                    schedule_date = ?, schedule_iso = ?, schedule_from = ?, schedule_to = ?, tag = ?,
+                    updated_at = CURRENT_TIMESTAMP, change_seq = ?
+                WHERE id = ? AND user_id = ?
+            ''', [values + (change_seq, result["id"], user_id) for result, values in planned['update']])
+        if planned['complete']:
+            conn.executemany('''
+                UPDATE tasks SET completed = ?, completed_at = CASE WHEN ? = 1 THEN CURRENT_TIMESTAMP END,
+                    updated_at = CURRENT_TIMESTAMP, change_seq = ?
+                WHERE id = ? AND user_id = ?
+            ''', [(completed, completed, change_seq, result["id"], user_id) for result, completed in planned['complete']])
+        if planned['delete']:
+            deleted = [(result["id"], user_id) for result, _ in planned['delete']]
+            conn.executemany('DELETE FROM tasks WHERE id = ? AND user_id = ?', deleted)
+            conn.executemany('''
+                INSERT OR REPLACE INTO task_tombstones (task_id, user_id, change_seq) VALUES (?, ?, ?)
+            ''', [(task_id, user_id, change_seq) for task_id, user_id in deleted])
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error applying task batch: {e}")
+        return jsonify({
+            "success": False,
+            "message": f"Error applying batch: {str(e)}",
+            "results": results
+        }), 500
+
+    # Return the written rows in one query
+    written = [result for kind in ('create', 'update', 'complete') for result, _ in planned[kind]]
+    rows = conn.execute(f'SELECT * FROM tasks WHERE id IN ({", ".join("?" * len(written))})',
+                        [result["id"] for result in written]).fetchall()
+    tasks = {row['id']: dict(row) for row in rows}
+    for result in written:
+        result["success"] = True
+        result["task"] = tasks.get(result["id"])
+    for result, _ in planned['delete']:
+        result["success"] = True
+
+    return jsonify({
+        "success": not failed,
+        "applied": sum(len(items) for items in planned.values()),
+        "results": results
+    })
+
 @app.route('/api/tasks/<int:task_id>', methods=['PUT'])
 def update_task(task_id):
     if 'user_id' not in session:
@@ -359,10 +1054,10 @@ def update_task(task_id):
                         (task_id, session['user_id'])).fetchone()
 
     if not task:
-        conn.close()
         return jsonify({"success": False, "message": "Task not found or not authorized"}), 404
 
     try:
+        change_seq = db.next_change_seq(conn, session['user_id'])
         conn.execute('''
             UPDATE tasks SET
                 task_title = ?,
@@ -370,9 +1065,12 @@ def update_task(task_id):
                 priority = ?,
                 time_required = ?,
                 schedule_date = ?,
+                schedule_iso = ?,
                 schedule_from = ?,
                 schedule_to = ?,
-                tag = ?
+                tag = ?,
+                updated_at = CURRENT_TIMESTAMP,
+                change_seq = ?
             WHERE id = ? AND user_id = ?
         ''', (
             task_data['task_title'],
@@ -380,16 +1078,17 @@ def update_task(task_id):
             task_data.get('priority', 'Medium'),
             task_data.get('time_required', ''),
             task_data.get('schedule_date', ''),
+            iso_date(task_data.get('schedule_date', '')),
             task_data.get('schedule_from', ''),
             task_data.get('schedule_to', ''),
             task_data.get('tag', 'OTHER'),
+            change_seq,
             task_id,
             session['user_id']
         ))
 
         conn.commit()
         updated_task = conn.execute('SELECT * FROM tasks WHERE id = ?', (task_id,)).fetchone()
-        conn.close()
 
         return jsonify({
             "success": True,
@@ -397,7 +1096,7 @@ def update_task(task_id):
         })
 
     except Exception as e:
-        conn.close()
+        conn.rollback()
         return jsonify({
             "success": False,
             "message": f"Error updating task: {str(e)}"
@@ -421,13 +1120,13 @@ def add_review(task_id):
                         (task_id, session['user_id'])).fetchone()
 
     if not task:
-        conn.close()
         return jsonify({"success": False, "message": "Task not found or not authorized"}), 404
 
     try:
-        conn.execute('UPDATE tasks SET review = ? WHERE id = ?', (review, task_id))
+        change_seq = db.next_change_seq(conn, session['user_id'])
+        conn.execute('UPDATE tasks SET review = ?, updated_at = CURRENT_TIMESTAMP, change_seq = ? WHERE id = ?',
+                     (review, change_seq, task_id))
         conn.commit()
-        conn.close()
 
         return jsonify({
             "success": True,
@@ -435,7 +1134,7 @@ def add_review(task_id):
         })
 
     except Exception as e:
-        conn.close()
+        conn.rollback()
         return jsonify({
             "success": False,
             "message": f"Error adding review: {str(e)}"
@@ -446,10 +1145,9 @@ def get_task(task_id):
     if 'user_id' not in session:
         return jsonify({"success": False, "message": "Unauthorized"}), 401
 
-    conn = get_db_connection()
+    conn = get_read_connection()
     task = conn.execute('SELECT * FROM tasks WHERE id = ? AND user_id = ?', 
                        (task_id, session['user_id'])).fetchone()
-    conn.close()
 
     if not task:
         return jsonify({"success": False, "message": "Task not found"}), 404
@@ -473,16 +1171,19 @@ def complete_task(task_id):
                             (task_id, session['user_id'])).fetchone()
 
         if not task:
-            conn.close()
             return jsonify({"success": False, "message": "Task not found or not authorized"}), 404
 
         # Toggle completion status
         new_status = 0 if task['completed'] == 1 else 1
-        cursor.execute('UPDATE tasks SET completed = ? WHERE id = ?', (new_status, task_id))
+        change_seq = db.next_change_seq(conn, session['user_id'])
+        cursor.execute('''
+            UPDATE tasks SET completed = ?, completed_at = CASE WHEN ? = 1 THEN CURRENT_TIMESTAMP END,
+                updated_at = CURRENT_TIMESTAMP, change_seq = ?
+            WHERE id = ?
+        ''', (new_status, new_status, change_seq, task_id))
         conn.commit()
 
         updated_task = cursor.execute('SELECT * FROM tasks WHERE id = ?', (task_id,)).fetchone()
-        conn.close()
 
         return jsonify({
             "success": True,
@@ -493,7 +1194,7 @@ def complete_task(task_id):
     except Exception as e:
         logger.error(f"Error updating task {task_id}: {str(e)}")
         if 'conn' in locals():
-            conn.close()
+            conn.rollback()
         return jsonify({
             "success": False,
             "message": f"Error updating task: {str(e)}"
@@ -511,13 +1212,13 @@ def delete_task(task_id):
                         (task_id, session['user_id'])).fetchone()
 
     if not task:
-        conn.close()
         return jsonify({"success": False, "message": "Task not found or not authorized"}), 404
 
     try:
+        change_seq = db.next_change_seq(conn, session['user_id'])
         conn.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
+        db.record_tombstone(conn, session['user_id'], task_id, change_seq)
         conn.commit()
-        conn.close()
 
         return jsonify({
             "success": True,
@@ -525,7 +1226,7 @@ def delete_task(task_id):
         })
 
     except Exception as e:
-        conn.close()
+        conn.rollback()
         return jsonify({
             "success": False,
             "message": f"Error deleting task: {str(e)}"
@@ -542,29 +1243,46 @@ def process_voice_input():
     if not text_input:
         return jsonify({"success": False, "message": "Text input is required"})
 
-    # Step 1: Classify intent
-    classification_prompt = f"""
+    # Step 1: Classify locally when the leading verb is unambiguous; then
+    # only the extraction call is needed
+    prediction = voice_classifier.classify(text_input)
+    if voice_classifier.is_confident(prediction) and not INTENT_CLASSIFIER_SHADOW:
+        metrics.incr('intent_classifier.local_hits')
+        intent = prediction.label
+        task_data = extract_task_details(text_input)
+    # Otherwise classify intent and extract task details in a single call
+    elif (command := classify_and_extract(text_input, VOICE_INTENTS, 'classify_extract_voice')) is not None:
+        intent = command.intent
+        task_data = command.task_data()
+    else:
+        # Fallback: separate classification and extraction calls
+        classification_prompt = f"""
     Classify the following user input into one of three categories:
     - CREATE_TASK
     - UPDATE_TASK
     - ADD_REVIEW
 
     Some example action verbs for each category:
-    - CREATE_TASK: create,add (new),schedule,plan,set up,arrange,assign,make a task,put on calendar,log (new task),add to list,note down,draft,prepare (task).
+    - CREATE_TASK: {VOICE_INTENTS['CREATE_TASK']}
 
-    - UPDATE_TASK: update,modify,change,edit,reschedule,shift,move,postpone,advance (earlier),delay,rename,adjust,revise,reprioritize.
+    - UPDATE_TASK: {VOICE_INTENTS['UPDATE_TASK']}
 
-    - ADD_REVIEW: add review, summarize,attach summary,add notes, attach a note, note what happened, log outcome,add feedback,leave comments, record what was done,write review,provide recap, summarize result, jot down reflection, add summary to task.
+    - ADD_REVIEW: {VOICE_INTENTS['ADD_REVIEW']}
 
     Only output one of the three labels above.
 
     Input: {text_input}
     """
-    classification_response = llm.invoke(classification_prompt)
-    intent = classification_response.content.strip().upper()
+        # Classification and extraction are independent, so run them concurrently
+        classification_response, task_data = run_concurrently(
+            lambda: invoke_cached(classification_prompt, 'classify_voice'),
+            lambda: extract_task_details(text_input),
+        )
+        intent = classification_response.content.strip().upper()
+
+    if INTENT_CLASSIFIER_SHADOW:
+        record_shadow(prediction, intent)
 
-    # Step 2: Extract task details
-    task_data = extract_task_details(text_input)
     is_valid, warnings = validate_task(task_data)
 
     return jsonify({
@@ -575,6 +1293,76 @@ def process_voice_input():
         "warnings": warnings
     })
 
+@app.route('/api/process-voice/batch', methods=['POST'])
+def process_voice_batch():
+    """Extract tasks from a dictated burst of notes in one request.
+
+    Body: {"text": "..."} to have the transcript split into notes, or
+    {"notes": [...]} with notes already split; either way more than
+    VOICE_BATCH_MAX_NOTES notes is a 400. Notes the local parsers
+    resolve need no LLM call; the rest are extracted with one llm.batch,
+    LLM_BATCH_CONCURRENCY at a time, so the request takes about as long as
+    the slowest note. ``candidates`` has one entry per note, in order, to
+    confirm and then save through /api/tasks/batch.
+    """
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    data = request.json or {}
+    notes = data.get('notes')
+    if notes is None:
+        notes = split_transcript(data.get('text', ''))
+    elif not isinstance(notes, list) or not all(isinstance(note, str) for note in notes):
+        return jsonify({"success": False, "message": "notes must be a list of strings"}), 400
+    else:
+        notes = [note.strip() for note in notes if note.strip()]
+
+    # Same cap for a split transcript as for a list: rejected, never cut short
+    if len(notes) > VOICE_BATCH_MAX_NOTES:
+        return jsonify({"success": False, "message": f"At most {VOICE_BATCH_MAX_NOTES} notes per request"}), 400
+
+    if not notes:
+        return jsonify({"success": False, "message": "Text input is required"})
+
+    now = datetime.now()
+    plans = [plan_task_extraction(note, now) for note in notes]
+    pending = [i for i, (_, call) in enumerate(plans) if call is not None]
+    responses = llm_cache.batch(
+        llm.for_kind('extract'),
+        [(prompt, template, PROMPT_VERSIONS[template], volatile)
+         for prompt, template, volatile in (plans[i][1] for i in pending)],
+        max_concurrency=LLM_BATCH_CONCURRENCY,
+        # extract_task and extract_task_core answers are both JSON objects
+        validate=PROMPT_VALIDATORS['extract_task'],
+    )
+    answers = dict(zip(pending, responses))
+    metrics.observe('voice_batch.notes', len(notes))
+
+    candidates = []
+    for i, (note, (task_data, call)) in enumerate(zip(notes, plans)):
+        candidate = {"text": note, "source": "local" if call is None else "llm"}
+        response = answers.get(i)
+        if isinstance(response, Exception):
+            metrics.incr('voice_batch.errors')
+            logger.error(f"Error extracting task from note: {response}")
+            candidate.update(task_data=None, is_valid=False, warnings=[f"Could not extract task details: {response}"])
+        else:
+            if response is not None:
+                task_data = finish_task_extraction(response, task_data)
+            is_valid, warnings = validate_task(task_data)
+            candidate.update(task_data=task_data, is_valid=is_valid, warnings=warnings)
+        candidates.append(candidate)
+
+    return jsonify({"success": True, "candidates": candidates})
+
+def resolve_task_title(conn, user_id, task_title):
+    """Ranked stored-task candidates for an extracted title, and whether
+    the best one is confident enough to show as the title to confirm."""
+    candidates = title_resolver.resolve(conn, user_id, task_title)
+    confident = title_resolver.is_confident(candidates)
+    metrics.incr('title_resolver.confident' if confident else 'title_resolver.unsure')
+    return candidates, confident
+
 @app.route('/api/search-task', methods=['POST'])
 def search_task():
     # 1. Identify User
@@ -591,38 +1379,18 @@ def search_task():
 
     # 4. Apply LLM to Extract Task Title
     title_prompt = """Extract the exact task title from this update request. Output only the title."""
-    title_response = llm.invoke(f"{title_prompt}\nText: {query}")
-    task_title = title_response.content.strip()
+    extract_title = lambda: invoke_cached(f"{title_prompt}\nText: {query}", 'extract_title')
 
     # 5. Return task title for editable textbox
     if data.get('extract_title_only'):
         return jsonify({
             "success": True,
-            "task_title": task_title
-        })
-
-    # Return just the title if that's all we need
-    if data.get('extract_title_only'):
-        return jsonify({
-            "success": True,
-            "task_title": task_title
-        })
-
-    # 6-8. Database Lookup and Update Attributes
-    conn = get_db_connection()
-    task = conn.execute("SELECT * FROM tasks WHERE user_id = ? AND task_title LIKE ? COLLATE NOCASE", 
-                       (session['user_id'], f'%{task_title}%')).fetchone()
-
-    if not task:
-        conn.close()
-        return jsonify({
-            "success": False,
-            "message": "No matching task found"
+            "task_title": extract_title().content.strip()
         })
 
-    task = dict(task)
-
-    # Extract updates from the prompt
+    # Extract updates from the prompt; this does not depend on the title, so
+    # both calls run concurrently
+    now = datetime.now().strftime('%A, %d %B %Y, %H:%M')
     update_prompt = f"""
         Parse the update details from this query. Output JSON with these fields:
         - description (string or F)
@@ -634,27 +1402,57 @@ def search_task():
         - time_required (decimal hours or F)
 
         Query: {query}
-        Current date: {datetime.now().strftime('%A, %d %B %Y, %H:%M')}
+        Current date: {now}
     """
-    update_response = llm.invoke(update_prompt)
+    title_query = data.get('title_query', '').strip()
+    if title_query:
+        # The user already confirmed the title; only the updates need the LLM
+        task_title = title_query
+        update_response = invoke_cached(update_prompt, 'parse_update', volatile=[now])
+    else:
+        title_response, update_response = run_concurrently(
+            extract_title,
+            lambda: invoke_cached(update_prompt, 'parse_update', volatile=[now]),
+        )
+        task_title = title_response.content.strip()
     updates = extract_json_from_llm_response(update_response)
 
+    # 6-8. Database Lookup and Update Attributes
+    conn = get_read_connection()
+    candidates, confident = resolve_task_title(conn, session['user_id'], task_title)
+    if candidates:
+        task = conn.execute('SELECT * FROM tasks WHERE id = ?', (candidates[0].task_id,)).fetchone()
+    else:
+        task = task_search.find_task_by_title(conn, session['user_id'], task_title)
+
+    if not task:
+        return jsonify({
+            "success": False,
+            "message": "No matching task found"
+        })
+
+    task = dict(task)
+
     # 9. Prepare data for editable table
     updated_task = task.copy()
     for field in ['description', 'schedule_date', 'schedule_from', 'schedule_to', 'tag', 'priority', 'time_required']:
         if field in updates and updates[field] != 'F':
             updated_task[field] = updates[field]
 
-    conn.close()
-
     return jsonify({
         "success": True,
         "original_task": task,
-        "proposed_updates": updated_task
+        "proposed_updates": updated_task,
+        "candidates": [candidate._asdict() for candidate in candidates],
+        "confident": confident
     })
 
 @app.route('/api/search-task-date', methods=['POST'])
 def search_task_date():
+    """Find the task to review and write its review from ``prompt``.
+
+    With respond_async() the review is written by a background job.
+    """
     if 'user_id' not in session:
         return jsonify({"success": False, "message": "Unauthorized"}), 401
 
@@ -665,24 +1463,25 @@ def search_task_date():
     if not task_title or not schedule_date:
         return jsonify({"success": False, "message": "Task title and date are required"})
 
-    conn = get_db_connection()
-    task = conn.execute("""
-        SELECT * FROM tasks 
-        WHERE user_id = ? 
-        AND task_title LIKE ? COLLATE NOCASE 
-        AND schedule_date LIKE ? COLLATE NOCASE
-    """, (session['user_id'], f'%{task_title}%', f'%{schedule_date}%')).fetchone()
+    conn = get_read_connection()
+    task = task_search.find_task_by_title(conn, session['user_id'], task_title, schedule_date=schedule_date)
 
     if not task:
-        conn.close()
         return jsonify({
             "success": False,
             "message": "No matching task found"
         })
 
-    result = dict(task)
-    
-    # Extract review from the prompt using LLM
+    payload = {"task_id": task['id'], "text": data.get('prompt', '')}
+    if not respond_async():
+        return jsonify(task_review_job(conn, session['user_id'], payload))
+
+    job = jobs.enqueue(get_db_connection(), session['user_id'], 'task_review', payload,
+                       request.headers.get('Idempotency-Key'))
+    return job_accepted(job)
+
+def generate_review(text):
+    """A short review of what ``text`` says was done, written by the LLM."""
     prompt = f"""
     You will receive a text describing a task, event, or activity. Your job is to write a short review summarizing the main actions or outcomes, focusing on what was achieved or done.
 
@@ -696,22 +1495,26 @@ Review: Successfully called mom for her birthday; she was happy and plans to vis
 
 Here’s the text:
 
-    Text: {data.get('prompt', '')}
+    Text: {text}
     Output should be a string.
     """
-    
-    print("DEBUG: Extracting review with prompt:", data.get('prompt', ''))
-    review_response = llm.invoke(prompt)
-    review = review_response.content.strip().strip('"').strip("'").strip('`')
-    
 
-    conn.close()
+    logger.debug(f"Extracting review with prompt: {text}")
+    review_response = llm.invoke(prompt, 'extract')
+    return review_response.content.strip().strip('"').strip("'").strip('`')
 
-    return jsonify({
+@jobs.handler('task_review')
+def task_review_job(conn, user_id, payload):
+    task = conn.execute('SELECT * FROM tasks WHERE id = ? AND user_id = ?',
+                        (payload['task_id'], user_id)).fetchone()
+    if not task:
+        return {"success": False, "message": "No matching task found"}
+
+    return {
         "success": True,
-        "task": result,
-        "review":review
-    })
+        "task": dict(task),
+        "review": generate_review(payload['text'])
+    }
 
 @app.route('/api/tasks/<int:task_id>/update-from-assistant', methods=['PUT'])
 def update_task_from_assistant(task_id):
@@ -730,10 +1533,10 @@ def update_task_from_assistant(task_id):
                        (task_id, session['user_id'])).fetchone()
 
     if not task:
-        conn.close()
         return jsonify({"success": False, "message": "Task not found"})
 
     try:
+        change_seq = db.next_change_seq(conn, session['user_id'])
         conn.execute('''
             UPDATE tasks SET
                 task_title = ?,
@@ -741,9 +1544,12 @@ def update_task_from_assistant(task_id):
                 priority = ?,
                 time_required = ?,
                 schedule_date = ?,
+                schedule_iso = ?,
                 schedule_from = ?,
                 schedule_to = ?,
-                tag = ?
+                tag = ?,
+                updated_at = CURRENT_TIMESTAMP,
+                change_seq = ?
             WHERE id = ? AND user_id = ?
         ''', (
             task_data['task_title'],
@@ -751,16 +1557,17 @@ def update_task_from_assistant(task_id):
             task_data['priority'],
             task_data['time_required'],
             task_data['schedule_date'],
+            iso_date(task_data['schedule_date']),
             task_data['schedule_from'],
             task_data['schedule_to'],
             task_data['tag'],
+            change_seq,
             task_id,
             session['user_id']
         ))
         conn.commit()
 
         updated_task = conn.execute('SELECT * FROM tasks WHERE id = ?', (task_id,)).fetchone()
-        conn.close()
 
         return jsonify({
             "success": True,
@@ -769,57 +1576,64 @@ def update_task_from_assistant(task_id):
         })
 
     except Exception as e:
-        conn.close()
+        conn.rollback()
         return jsonify({
             "success": False,
             "message": f"Error updating task: {str(e)}"
         })
 
 @app.route('/api/analytics', methods=['GET'])
+@conditional_on_version()
 def get_analytics():
     if 'user_id' not in session:
         return jsonify({"success": False, "message": "Unauthorized"}), 401
 
-    conn = get_db_connection()
-
-    # Get completion rate
-    total_tasks = conn.execute('SELECT COUNT(*) as count FROM tasks WHERE user_id = ?', 
-                              (session['user_id'],)).fetchone()['count']
-    completed_tasks = conn.execute('SELECT COUNT(*) as count FROM tasks WHERE user_id = ? AND completed = 1', 
-                                  (session['user_id'],)).fetchone()['count']
-
-    completion_rate = 0 if total_tasks == 0 else round((completed_tasks / total_tasks) * 100)
+    conn = get_read_connection()
+    return jsonify({
+        "success": True,
+        "analytics": analytics.get_user_analytics(conn, session['user_id'])
+    })
 
-    # Get priority distribution
-    priority_distribution = conn.execute('''
-        SELECT priority, COUNT(*) as count 
-        FROM tasks 
-        WHERE user_id = ? 
-        GROUP BY priority
-    ''', (session['user_id'],)).fetchall()
+TIMESERIES_DEFAULT_DAYS = 30
+TIMESERIES_MAX_DAYS = 731
 
-    # Get tag distribution
-    tag_distribution = conn.execute('''
-        SELECT tag, COUNT(*) as count 
-        FROM tasks 
-        WHERE user_id = ? 
-        GROUP BY tag
-    ''', (session['user_id'],)).fetchall()
+@app.route('/api/analytics/timeseries', methods=['GET'])
+@conditional_on_version(per_day=True)
+def get_analytics_timeseries():
+    """Productivity trends from the daily rollup.
 
-    conn.close()
+    Query parameters: from / to (DD/MM/YYYY or YYYY-MM-DD, default the last
+    30 days) and granularity (day or week, default day).
+    """
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
 
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in analytics.TIMESERIES_GRANULARITIES:
+        return jsonify({"success": False, "message": "granularity must be day or week"}), 400
+
+    bounds = {}
+    for name in ('from', 'to'):
+        if request.args.get(name):
+            value = parse_date_param(request.args[name])
+            if value is None:
+                return jsonify({"success": False, "message": f"Invalid {name} date"}), 400
+            bounds[name] = date.fromisoformat(value)
+    end = bounds.get('to', date.today())
+    start = bounds.get('from', end - timedelta(days=TIMESERIES_DEFAULT_DAYS - 1))
+    if start > end:
+        return jsonify({"success": False, "message": "from must not be after to"}), 400
+    if (end - start).days >= TIMESERIES_MAX_DAYS:
+        return jsonify({"success": False, "message": f"Range is limited to {TIMESERIES_MAX_DAYS} days"}), 400
+
+    conn = get_read_connection()
     return jsonify({
         "success": True,
-        "analytics": {
-            "completion_rate": completion_rate,
-            "priority_distribution": [dict(item) for item in priority_distribution],
-            "tag_distribution": [dict(item) for item in tag_distribution],
-            "total_tasks": total_tasks,
-            "completed_tasks": completed_tasks
-        }
+        "timeseries": analytics.timeseries(conn, session['user_id'], start, end, granularity)
     })
 
 @app.route('/api/calendar-tasks', methods=['GET'])
+@conditional_on_version()
 def get_calendar_tasks():
     if 'user_id' not in session:
         return jsonify({"success": False, "message": "Unauthorized"}), 401
@@ -830,59 +1644,43 @@ def get_calendar_tasks():
     if not month or not year:
         return jsonify({"success": False, "message": "Month and year are required"})
 
-    conn = get_db_connection()
+    try:
+        month_start = date(int(year), int(month), 1)
+    except (ValueError, TypeError):
+        return jsonify({"success": False, "message": "Invalid month or year"})
+    month_end = month_start.replace(day=calendar.monthrange(month_start.year, month_start.month)[1])
+
+    conn = get_read_connection()
 
-    # Query tasks with schedule_date in the specified month
+    # Range scan on the ISO column; rows without a valid date have NULL there
     tasks = conn.execute('''
         SELECT * FROM tasks 
-        WHERE user_id = ? AND schedule_date != "F" 
-        ORDER BY schedule_date, schedule_from
-    ''', (session['user_id'],)).fetchall()
-
-    conn.close()
-
-    # Filter tasks by month and year
-    filtered_tasks = []
-    for task in tasks:
-        try:
-            task_date = datetime.strptime(task['schedule_date'], "%d/%m/%Y")
-            if task_date.month == int(month) and task_date.year == int(year):
-                filtered_tasks.append(dict(task))
-        except (ValueError, TypeError):
-            # Skip tasks with invalid dates
-            continue
+        WHERE user_id = ? AND schedule_iso BETWEEN ? AND ?
+        ORDER BY schedule_iso, schedule_from
+    ''', (session['user_id'], month_start.isoformat(), month_end.isoformat())).fetchall()
 
     return jsonify({
         "success": True,
-        "tasks": filtered_tasks
+        "tasks": [dict(task) for task in tasks]
     })
 
-@app.route('/api/task-summary', methods=['GET'])
-def get_task_summary():
-    if 'user_id' not in session:
-        return jsonify({"success": False, "message": "Unauthorized"}), 401
-
-    conn = get_db_connection()
+NO_TASKS_SUMMARY = "Example summary: You don't have any tasks scheduled for today. Great job staying organized!"
 
-    # Get tasks for summary
+def get_today_tasks(conn, user_id):
     today = datetime.now().strftime("%d/%m/%Y")
-
-    today_tasks = conn.execute('''
+    return conn.execute('''
         SELECT * FROM tasks 
         WHERE user_id = ? AND schedule_date = ?
         ORDER BY priority, schedule_from
-    ''', (session['user_id'], today)).fetchall()
-
-    conn.close()
+    ''', (user_id, today)).fetchall()
 
-    # Generate summary with LLM
-    if today_tasks:
-        task_list = "\n".join([
-            f"- {task['task_title']} (Priority: {task['priority']}, Description: {task['description']}, Review: {task['review']}, Schedule_from: {task['schedule_from']}, Schedule_to: {task['schedule_to']})"
-            for task in today_tasks
-        ])
+def build_summary_prompt(today_tasks):
+    task_list = "\n".join([
+        f"- {task['task_title']} (Priority: {task['priority']}, Description: {task['description']}, Review: {task['review']}, Schedule_from: {task['schedule_from']}, Schedule_to: {task['schedule_to']})"
+        for task in today_tasks
+    ])
 
-        prompt = f"""
+    return f"""
             Generate a short summary of today's tasks. Use the reviews and description specifically for the tasks. Create a separate short paragraph for each task. Order should be chronological.
 
             Today's tasks:
@@ -890,14 +1688,141 @@ def get_task_summary():
         
         """
 
-        response = llm.invoke(prompt)
-        summary = response.content.strip()
-    else:
-        summary = "Example summary: You don't have any tasks scheduled for today. Great job staying organized!"
+@app.route('/api/task-summary', methods=['GET'])
+@conditional_on_version(per_day=True)
+def get_task_summary():
+    """Today's summary, from the summary cache when today's tasks allow.
 
-    return jsonify({
-        "success": True,
-        "summary": summary
+    A cached summary of an older version of today's tasks is returned at
+    once with ``stale: true`` while a background job generates a fresh one.
+    With no summary for today yet, it is generated in the request, or with
+    respond_async() by that job, answering 202 with its id.
+
+    ``task_summary.ttfb_ms`` times the answers that carry a summary; a job's
+    generation shows up as ``jobs.task_summary.run_ms``.
+    """
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    started = time.monotonic()
+    user_id = session['user_id']
+    conn = get_read_connection()
+
+    def answer(summary, stale=False):
+        if stale:
+            response = jsonify({"success": True, "summary": summary, "stale": True})
+            response.headers['Cache-Control'] = 'no-store'
+        else:
+            response = jsonify({"success": True, "summary": summary})
+        metrics.observe('task_summary.ttfb_ms', (time.monotonic() - started) * 1000)
+        return response
+
+    # Get tasks for summary
+    today_tasks = get_today_tasks(conn, user_id)
+    if not today_tasks:
+        return answer(NO_TASKS_SUMMARY)
+
+    day = date.today().isoformat()
+    prompt_hash = summary_cache.content_hash(today_tasks, PROMPT_VERSIONS['task_summary'])
+    cached = summary_cache.lookup(conn, user_id, day)
+
+    if cached and cached['prompt_hash'] == prompt_hash:
+        metrics.incr('summary_cache.hits')
+        return answer(cached['summary'])
+
+    if not cached:
+        metrics.incr('summary_cache.misses')
+        if not respond_async():
+            # Nothing to fall back on: generate with the LLM now
+            return answer(generate_daily_summary(conn, user_id))
+
+    # One job per write, however many requests ask. The change sequence is
+    # in the key because a reverted edit brings back an earlier prompt hash
+    # whose job has already succeeded.
+    key = f"{day}:{prompt_hash}:{db.current_change_seq(conn, user_id)}"
+    job = jobs.enqueue(get_db_connection(), user_id, 'task_summary', {}, key)
+    if cached:
+        metrics.incr('summary_cache.stale')
+        return answer(cached['summary'], stale=True)
+
+    # The client waits for the job
+    return job_accepted(job)
+
+def generate_daily_summary(conn, user_id):
+    """Today's summary for the user, generated unless already cached."""
+    today_tasks = get_today_tasks(conn, user_id)
+    if not today_tasks:
+        return NO_TASKS_SUMMARY
+
+    day = date.today().isoformat()
+    prompt_hash = summary_cache.content_hash(today_tasks, PROMPT_VERSIONS['task_summary'])
+    cached = summary_cache.lookup(conn, user_id, day)
+    if cached and cached['prompt_hash'] == prompt_hash:
+        return cached['summary']
+
+    summary = llm.invoke(build_summary_prompt(today_tasks), 'summary').content.strip()
+    summary_cache.store(user_id, day, prompt_hash, summary)
+    return summary
+
+@jobs.handler('task_summary')
+def task_summary_job(conn, user_id, payload):
+    return {"success": True, "summary": generate_daily_summary(conn, user_id)}
+
+def sse_event(data, event=None):
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+@app.route('/api/task-summary/stream', methods=['GET'])
+def stream_task_summary():
+    """Server-Sent Events variant of GET /api/task-summary.
+
+    Sends one ``message`` event per LLM chunk ({"text": ...}) and a final
+    ``done`` event, or an ``error`` event if generation fails. A cached
+    summary of exactly today's tasks is sent as a single message instead.
+    """
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    started = time.monotonic()
+    user_id = session['user_id']
+    conn = get_read_connection()
+    today_tasks = get_today_tasks(conn, user_id)
+    prompt = build_summary_prompt(today_tasks) if today_tasks else None
+    day = date.today().isoformat()
+    prompt_hash = summary_cache.content_hash(today_tasks, PROMPT_VERSIONS['task_summary'])
+    cached = summary_cache.lookup(conn, user_id, day) if today_tasks else None
+    if cached and cached['prompt_hash'] != prompt_hash:
+        # Stale: the user asked for a summary, so stream a fresh one
+        cached = None
+
+    def generate():
+        if prompt is None or cached:
+            if cached:
+                metrics.incr('summary_cache.hits')
+            yield sse_event({"text": cached['summary'] if cached else NO_TASKS_SUMMARY})
+            yield sse_event({}, event="done")
+            return
+
+        first = True
+        chunks = []
+        try:
+            for chunk in llm.stream(prompt, 'summary'):
+                if not chunk.content:
+                    continue
+                if first:
+                    metrics.observe('task_summary_stream.ttfb_ms', (time.monotonic() - started) * 1000)
+                    first = False
+                chunks.append(chunk.content)
+                yield sse_event({"text": chunk.content})
+            summary_cache.store(user_id, day, prompt_hash, "".join(chunks).strip())
+            yield sse_event({}, event="done")
+        except Exception as e:
+            logger.error(f"Error streaming task summary: {e}")
+            yield sse_event({"message": "Error generating summary"}, event="error")
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
     })
 
 @app.route('/api/task-summary', methods=['POST'])
@@ -912,7 +1837,7 @@ def generate_task_summary():
         return jsonify({"success": False, "message": "Prompt is required"})
 
     try:
-        response = llm.invoke(prompt)
+        response = llm.invoke(prompt, 'summary')
         return jsonify({
             "success": True,
             "response": response.content.strip()
@@ -925,6 +1850,12 @@ def generate_task_summary():
 
 @app.route('/api/llm-assistant', methods=['POST'])
 def llm_assistant():
+    """The assistant's answer to a chat message.
+
+    The intent is classified in the request. With respond_async(), an
+    intent whose details still need another LLM call is finished by a
+    background job instead (202).
+    """
     if 'user_id' not in session:
         return jsonify({"success": False, "message": "Unauthorized"}), 401
 
@@ -934,57 +1865,102 @@ def llm_assistant():
     if not prompt:
         return jsonify({"success": False, "message": "Prompt is required"})
 
-    try:
-        # Step 1: Classify intent
+    intent, command = classify_assistant_prompt(prompt)
+    if command is not None or intent not in ASSISTANT_INTENTS or not respond_async():
+        return jsonify(assistant_reply(get_read_connection(), session['user_id'], prompt, intent, command))
+
+    job = jobs.enqueue(get_db_connection(), session['user_id'], 'assistant',
+                       {"prompt": prompt, "intent": intent}, request.headers.get('Idempotency-Key'))
+    return job_accepted(job)
+
+@jobs.handler('assistant')
+def assistant_job(conn, user_id, payload):
+    """The rest of the assistant's answer once llm_assistant has the intent."""
+    if 'intent' not in payload:
+        # Queued before the intent was classified in the request
+        return assistant_reply(conn, user_id, payload['prompt'], *classify_assistant_prompt(payload['prompt']))
+    return assistant_reply(conn, user_id, payload['prompt'], payload['intent'])
+
+def classify_assistant_prompt(prompt):
+    """(intent, command) for a chat message.
+
+    ``command`` is the combined classify+extract answer, or None when the
+    intent came from elsewhere and its details are still to be extracted.
+    """
+    # Classify locally when the leading verb is unambiguous;
+    # assistant_reply then makes its own extraction call
+    prediction = assistant_classifier.classify(prompt)
+    command = None
+    if assistant_classifier.is_confident(prediction) and not INTENT_CLASSIFIER_SHADOW:
+        metrics.incr('intent_classifier.local_hits')
+        intent = prediction.label
+    # Otherwise classify intent and extract details in a single call
+    elif (command := classify_and_extract(prompt, ASSISTANT_INTENTS, 'classify_extract_assistant')) is not None:
+        intent = command.intent
+    else:
+        # Fallback: separate classification call
         classification_prompt = f"""
-        Classify the following user input into one of three categories:
-        - CREATE_TASK
-        - MODIFY_TASK
-        - ADD_REVIEW
+    Classify the following user input into one of three categories:
+    - CREATE_TASK
+    - MODIFY_TASK
+    - ADD_REVIEW
 
-        Only output one of the three labels above.
+    Only output one of the three labels above.
 
-        Input: {prompt}
-        """
-        classification_response = llm.invoke(classification_prompt)
+    Input: {prompt}
+    """
+        classification_response = invoke_cached(classification_prompt, 'classify_assistant')
         intent = classification_response.content.strip().upper()
 
-        # Step 2: Process based on intent
-        if intent == "CREATE_TASK":
-            # Extract task details
-            task_data = extract_task_details(prompt)
-            is_valid, warnings = validate_task(task_data)
+    if INTENT_CLASSIFIER_SHADOW:
+        record_shadow(prediction, intent)
+    return intent, command
+
+def assistant_reply(conn, user_id, prompt, intent, command=None):
+    """The assistant's answer for a classified chat message."""
+    if intent == "CREATE_TASK":
+        # Extract task details
+        task_data = command.task_data() if command is not None else extract_task_details(prompt)
+        is_valid, warnings = validate_task(task_data)
 
-            return jsonify({
-                "success": True,
-                "intent": intent,
-                "task_data": task_data,
-                "is_valid": is_valid,
-                "warnings": warnings
-            })
-
-        elif intent == "MODIFY_TASK":
-            # Return a list of tasks for the user to choose from
-            # Extract task title from prompt
+        return {
+            "success": True,
+            "intent": intent,
+            "task_data": task_data,
+            "is_valid": is_valid,
+            "warnings": warnings
+        }
+
+    elif intent == "MODIFY_TASK":
+        # Return a list of tasks for the user to choose from
+        # Extract task title from prompt
+        if command is not None:
+            task_title = command.task_title
+        else:
             title_prompt = """Extract the exact task title from this update request. Output only the title."""
-            title_response = llm.invoke(f"{title_prompt}\nText: {prompt}")
+            title_response = invoke_cached(f"{title_prompt}\nText: {prompt}", 'extract_title')
             task_title = title_response.content.strip()
 
-            # Get task details from database
-            conn = get_db_connection()
-            task = conn.execute('SELECT * FROM tasks WHERE user_id = ? AND task_title LIKE ? COLLATE NOCASE', 
-                              (session['user_id'], f'%{task_title}%')).fetchone()
-            conn.close()
-
-            # First just return the extracted title for confirmation
-            return jsonify({
-                "success": True,
-                "intent": intent,                "task_title": task_title,
-                "message": "Please confirm the task title:"
-            })
-
-        elif intent == "ADD_REVIEW":
-            # Identify which task to add a review to
+        # Match it against the stored titles so the user confirms a real one
+        candidates, confident = resolve_task_title(conn, user_id, task_title)
+
+        # First just return the extracted title for confirmation
+        return {
+            "success": True,
+            "intent": intent,
+            "task_title": candidates[0].task_title if confident else task_title,
+            "candidates": [candidate._asdict() for candidate in candidates],
+            "confident": confident,
+            "message": "Please confirm the task title:"
+        }
+
+    elif intent == "ADD_REVIEW":
+        # Identify which task to add a review to
+        today = datetime.now().strftime('%d/%m/%Y')
+        if command is not None:
+            task_title = command.task_title
+            scheduled_date = command.schedule_date if command.schedule_date != "F" else today
+        else:
             assistant_prompt = f"""
             The user wants to add a review to a task. Based on the query below, identify the task title and schedule date.
 
@@ -992,7 +1968,7 @@ def llm_assistant():
 
             Respond with:
             1. The exact task title from this request
-            2. The scheduled date (in DD/MM/YYYY format) today is {datetime.now().strftime('%d/%m/%Y')}
+            2. The scheduled date (in DD/MM/YYYY format) today is {today}
 
            The output should be in JSON format:
             {{
@@ -1001,29 +1977,52 @@ def llm_assistant():
             }}
             """
 
-            response = llm.invoke(assistant_prompt)
+            response = invoke_cached(assistant_prompt, 'identify_review_target', volatile=[today])
             extracted_data = extract_json_from_llm_response(response)
             task_title = extracted_data.get('task_title', '')
             scheduled_date = extracted_data.get('scheduled_date', datetime.now().strftime('%d/%m/%Y'))
 
-            conn = get_db_connection()
-            task = conn.execute("SELECT * FROM tasks WHERE user_id = ? AND task_title LIKE ? COLLATE NOCASE",
-                (session['user_id'], f'%{task_title}%')
-            ).fetchone()
-            conn.close()
-
-            return jsonify({
-                "success": True,
-                "intent": intent,
-                "task_title": task_title,
-                "scheduled_date": scheduled_date,
-                "message": "Please confirm the task title and scheduled date:"
-            })
-    except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": str(e)
-        }), 500
+        candidates, confident = resolve_task_title(conn, user_id, task_title)
+
+        return {
+            "success": True,
+            "intent": intent,
+            "task_title": candidates[0].task_title if confident else task_title,
+            "candidates": [candidate._asdict() for candidate in candidates],
+            "confident": confident,
+            "scheduled_date": scheduled_date,
+            "message": "Please confirm the task title and scheduled date:"
+        }
+
+    return {"success": False, "message": "Sorry, I could not tell what you want to do."}
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """A background job's status, and its result once it has finished.
+
+    With ``?wait=<seconds>`` (at most JOB_MAX_WAIT) the answer is held back
+    until the job finishes or the wait is over.
+    """
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    # For servers started without jobs.start() (e.g. flask run)
+    jobs.ensure_workers()
+    conn = get_read_connection()
+    wait = min(max(request.args.get('wait', 0, type=float), 0), jobs.JOB_MAX_WAIT)
+    job = jobs.wait_for(conn, session['user_id'], job_id, wait)
+    if job is None:
+        return jsonify({"success": False, "message": "Job not found"}), 404
+
+    return jsonify({"success": True, "job": jobs.to_dict(job)})
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    return jsonify({
+        "success": True,
+        "metrics": metrics.snapshot()
+    })
 
 if __name__ == '__main__':
+    jobs.start()
     app.run(host='0.0.0.0', port=8080, debug=True)
@@ -0,0 +1,278 @@
+"""Deterministic parser for the scheduling part of a task note.
+
+Resolves relative and absolute dates ("tomorrow", "on friday", "in 3 days",
+"12/05/2025", "5th May"), clock times ("5pm", "17:30", "noon"), time ranges
+("3-5pm", "from 9am to 11am") and durations ("for two hours", "45 minutes")
+into the same DD/MM/YYYY and HH:MM strings extract_task_details produces.
+
+The parser only reports what it can resolve without guessing: ambiguous
+phrases ("next friday", a bare "at 7", two different dates) leave the field
+unset so the LLM handles them.
+"""
+import re
+from datetime import datetime, timedelta
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12,
+}
+
+_NUMBER = r'(\d+(?:\.\d+)?|' + '|'.join(NUMBER_WORDS) + r')'
+_MONTH = r'(' + '|'.join(f'{m}[a-z]*' for m in MONTHS) + r')'
+_CLOCK = r'(\d{1,2})(?::([0-5]\d))?\s*([ap])\.?m\.?'
+_CLOCK_24 = r'([01]?\d|2[0-3]):([0-5]\d)'
+_ANY_TIME = r'(\d{1,2})(?::([0-5]\d))?\s*(?:([ap])\.?m\.?)?'
+
+_DATE_PATTERNS = [
+    ('numeric', re.compile(r'\b(\d{1,2})/(\d{1,2})(?:/(\d{4}))?\b')),
+    ('day_month', re.compile(r'\b(?:on\s+)?(?:the\s+)?(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?' + _MONTH + r'(?:,?\s+(\d{4}))?\b', re.I)),
+    ('month_day', re.compile(r'\b(?:on\s+)?' + _MONTH + r'\s+(\d{1,2})(?:st|nd|rd|th)?(?:,?\s+(\d{4}))?\b', re.I)),
+    ('relative_day', re.compile(r'\b(day after tomorrow|tomorrow|today|tonight|this evening|this morning|this afternoon)\b', re.I)),
+    ('in_days', re.compile(r'\bin\s+' + _NUMBER + r'\s+(days?|weeks?)\b', re.I)),
+    ('weekday', re.compile(r'\b(?:(on|this|next|coming)\s+)?(' + '|'.join(WEEKDAYS) + r')\b', re.I)),
+]
+
+# "and" only separates a range after "between": "at 5pm and 8pm" is two times
+_RANGE = re.compile(
+    r'\b(?:(from|between)\s+)?' + _ANY_TIME + r'\s*(-|–|to|till|until|and)\s*' + _ANY_TIME + r'(?!\s*(?:hours?|hrs?|minutes?|mins?)\b)',
+    re.I
+)
+# "by"/"before" make the time a deadline, not a start; those are left to the LLM
+_TIME = re.compile(r'\b(?:(at|from|by|before)\s+)?(?:' + _CLOCK + r'|' + _CLOCK_24 + r'|(noon|midday|midnight))', re.I)
+_DURATION = re.compile(
+    r'(?<!\bin )\b(?:for\s+)?(?:(?:an?|one)\s+hour\s+and\s+a\s+half|(half\s+an?\s+hour)|'
+    + _NUMBER + r'\s*(hours?|hrs?|h|minutes?|mins?)\b(?:\s+and\s+' + _NUMBER + r'\s*(minutes?|mins?)\b)?)',
+    re.I
+)
+
+
+def _number(token):
+    token = token.lower()
+    return float(NUMBER_WORDS[token]) if token in NUMBER_WORDS else float(token)
+
+
+def _month_index(token):
+    return MONTHS.index(token[:3].lower()) + 1
+
+
+def _to_24h(hour, minute, meridiem):
+    hour, minute = int(hour), int(minute or 0)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem.lower() == 'p' else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return hour * 60 + minute
+
+
+def _format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _format_hours(hours):
+    return f"{round(hours, 2):g}"
+
+
+class ParsedSchedule:
+    def __init__(self, text):
+        self.text = text
+        self.schedule_date = None
+        self.schedule_from = None
+        self.schedule_to = None
+        self.time_required = None
+        self.spans = []
+
+    @property
+    def complete(self):
+        return all([self.schedule_date, self.schedule_from, self.schedule_to, self.time_required])
+
+    def fields(self):
+        """Resolved fields in the extract_task_details format ("F" if unknown)."""
+        return {
+            'schedule_date': self.schedule_date or "F",
+            'schedule_from': self.schedule_from or "F",
+            'schedule_to': self.schedule_to or "F",
+            'time_required': self.time_required or "F",
+        }
+
+    @property
+    def remainder(self):
+        """The note with every parsed date/time phrase cut out."""
+        pieces, last = [], 0
+        for start, end in sorted(self.spans):
+            if start >= last:
+                pieces.append(self.text[last:start])
+                last = end
+        pieces.append(self.text[last:])
+        text = ' '.join(pieces)
+        text = re.sub(r'\s+', ' ', text).strip(' ,.;')
+        # Connectives left dangling by the removed phrases
+        dangling = r'(?:at|on|from|for|by|to|in|between|and|of|the)'
+        text = re.sub(rf'(?:\s+{dangling})+\s*$', '', text, flags=re.I)
+        text = re.sub(rf'\b{dangling}\s+(?={dangling}\b)', '', text, flags=re.I)
+        return re.sub(r'\s+', ' ', text).strip(' ,.;')
+
+
+def _overlaps(span, spans):
+    return any(span[0] < end and start < span[1] for start, end in spans)
+
+
+def _parse_date(kind, match, now):
+    today = now.date()
+    if kind == 'numeric':
+        day, month, year = int(match.group(1)), int(match.group(2)), match.group(3)
+        return _build_date(day, month, year, today)
+    if kind == 'day_month':
+        return _build_date(int(match.group(1)), _month_index(match.group(2)), match.group(3), today)
+    if kind == 'month_day':
+        return _build_date(int(match.group(2)), _month_index(match.group(1)), match.group(3), today)
+    if kind == 'relative_day':
+        phrase = match.group(1).lower()
+        if phrase == 'day after tomorrow':
+            return today + timedelta(days=2)
+        if phrase == 'tomorrow':
+            return today + timedelta(days=1)
+        return today
+    if kind == 'in_days':
+        count = _number(match.group(1))
+        if count != int(count):
+            return None
+        days = int(count) * (7 if match.group(2).lower().startswith('week') else 1)
+        return today + timedelta(days=days)
+    if kind == 'weekday':
+        qualifier = (match.group(1) or '').lower()
+        if qualifier in ('next', 'coming'):
+            # "next friday" is read as either this week's or next week's
+            return None
+        offset = (WEEKDAYS.index(match.group(2).lower()) - today.weekday()) % 7
+        if offset == 0 and qualifier != 'this':
+            offset = 7
+        return today + timedelta(days=offset)
+    return None
+
+
+def _build_date(day, month, year, today):
+    try:
+        if year:
+            return datetime(int(year), month, day).date()
+        candidate = datetime(today.year, month, day).date()
+        if candidate < today:
+            candidate = datetime(today.year + 1, month, day).date()
+        return candidate
+    except ValueError:
+        return None
+
+
+def _parse_range(match):
+    lead, h1, m1, ap1, separator, h2, m2, ap2 = match.groups()
+    if separator.lower() == 'and' and (lead or '').lower() != 'between':
+        return None
+    if not (ap1 or ap2 or m1 or m2):
+        # "3-5" or "from 3 to 5" could be anything
+        return None
+    if ap2 and not ap1:
+        # "3-5pm", "2:30-3pm": give the start the end's meridiem when that
+        # keeps it earlier
+        end = _to_24h(h2, m2, ap2)
+        start = _to_24h(h1, m1, ap2)
+        if start is None or end is None or start >= end:
+            start = _to_24h(h1, m1, 'a' if ap2.lower() == 'p' else 'p')
+    else:
+        start = _to_24h(h1, m1, ap1)
+        end = _to_24h(h2, m2, ap2 or (ap1 if not m2 else None))
+    if start is None or end is None or end <= start:
+        return None
+    return start, end
+
+
+def _parse_time(match):
+    _, hour, minute, meridiem, hour_24, minute_24, named = match.groups()
+    if named:
+        return {'noon': 12 * 60, 'midday': 12 * 60, 'midnight': 0}[named.lower()]
+    if meridiem:
+        return _to_24h(hour, minute, meridiem)
+    return _to_24h(hour_24, minute_24, None)
+
+
+def _parse_duration(match):
+    text = match.group(0).lower()
+    if 'and a half' in text:
+        return 1.5
+    if match.group(1):
+        return 0.5
+    amount, unit, extra, extra_unit = match.group(2), match.group(3), match.group(4), match.group(5)
+    hours = _number(amount) if unit.lower().startswith('h') else _number(amount) / 60
+    if extra:
+        hours += _number(extra) / 60
+    return hours
+
+
+def parse_schedule(text, now=None):
+    """Parse the scheduling fields of a note; see ParsedSchedule."""
+    now = now or datetime.now()
+    result = ParsedSchedule(text)
+    taken = []
+
+    # Dates first: their digits must not be read as times
+    dates = set()
+    ambiguous_date = False
+    for kind, pattern in _DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            if _overlaps(match.span(), taken):
+                continue
+            taken.append(match.span())
+            value = _parse_date(kind, match, now)
+            if value is None:
+                ambiguous_date = True
+            else:
+                dates.add(value)
+    if len(dates) == 1 and not ambiguous_date:
+        result.schedule_date = dates.pop().strftime("%d/%m/%Y")
+
+    duration = None
+    durations = [m for m in _DURATION.finditer(text) if not _overlaps(m.span(), taken)]
+    if len(durations) == 1:
+        duration = _parse_duration(durations[0])
+        taken.append(durations[0].span())
+
+    start = end = None
+    conflicting = False
+    ranges = [m for m in _RANGE.finditer(text) if not _overlaps(m.span(), taken)]
+    if len(ranges) == 1:
+        parsed = _parse_range(ranges[0])
+        if parsed:
+            start, end = parsed
+            if duration and round(duration * 60) != end - start:
+                # "3-5pm for 1 hour" contradicts itself; leave it to the LLM
+                start = end = duration = None
+                conflicting = True
+                taken.remove(durations[0].span())
+            else:
+                taken.append(ranges[0].span())
+    if start is None and not conflicting:
+        times = [m for m in _TIME.finditer(text) if not _overlaps(m.span(), taken)]
+        deadline = any((m.group(1) or '').lower() in ('by', 'before') for m in times)
+        if len(times) == 1 and not deadline:
+            start = _parse_time(times[0])
+            if start is not None:
+                taken.append(times[0].span())
+
+    if start is not None:
+        result.schedule_from = _format_minutes(start)
+        if end is None and duration:
+            end = start + round(duration * 60)
+            if end >= 24 * 60:
+                end = None
+        if end is not None:
+            result.schedule_to = _format_minutes(end)
+
+    if duration:
+        result.time_required = _format_hours(duration)
+    elif start is not None and end is not None:
+        result.time_required = _format_hours((end - start) / 60)
+
+    result.spans = taken
+    return result
@@ -0,0 +1,544 @@
+"""SQLite connection management and schema migrations.
+
+Each worker thread keeps one read-write and one read-only connection open for
+its whole lifetime instead of reconnecting on every request. The connections
+are handed to request code through ``flask.g`` and any transaction left open
+by a request is rolled back when the app context is torn down.
+
+The schema is versioned with ``PRAGMA user_version``; ``migrate()`` applies
+the entries of ``MIGRATIONS`` that the database file has not seen yet.
+"""
+import os
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+
+from flask import g
+
+logger = logging.getLogger(__name__)
+
+DATABASE = os.environ.get('DATABASE_PATH', 'tasks.db')
+
+# Applied to every connection. WAL lets readers run alongside a writer,
+# busy_timeout makes concurrent writers from other workers wait instead of
+# failing with "database is locked".
+CONNECTION_PRAGMAS = (
+    ('busy_timeout', int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -int(os.environ.get('SQLITE_CACHE_KB', 4096))),
+    ('mmap_size', int(os.environ.get('SQLITE_MMAP_BYTES', 128 * 1024 * 1024))),
+    ('temp_store', 'MEMORY'),
+)
+
+_local = threading.local()
+
+
+def open_connection(readonly=False, path=None):
+    """Open a new tuned connection to the database (or another SQLite file)."""
+    path = path or DATABASE
+    if readonly:
+        uri = f"file:{os.path.abspath(path)}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True)
+        conn.execute('PRAGMA query_only = ON')
+    else:
+        conn = sqlite3.connect(path)
+        conn.execute('PRAGMA journal_mode = WAL')
+    conn.row_factory = sqlite3.Row
+    for name, value in CONNECTION_PRAGMAS:
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+def _thread_connection(readonly):
+    # Connections must not be shared with a forked child (gunicorn workers
+    # fork from the master), so the cache is reset when the pid changes.
+    if getattr(_local, 'pid', None) != os.getpid():
+        _local.__dict__.clear()
+        _local.pid = os.getpid()
+
+    attr = 'reader' if readonly else 'writer'
+    conn = getattr(_local, attr, None)
+    if conn is None:
+        conn = open_connection(readonly)
+        setattr(_local, attr, conn)
+    return conn
+
+
+def get_db_connection():
+    """Return the read-write connection for the current app context."""
+    if 'db' not in g:
+        g.db = _thread_connection(readonly=False)
+    return g.db
+
+
+def get_read_connection():
+    """Return the read-only connection for the current app context."""
+    if 'db_readonly' not in g:
+        g.db_readonly = _thread_connection(readonly=True)
+    return g.db_readonly
+
+
+def release_connections(exception=None):
+    """Return the context's connections to the thread cache.
+
+    The connections stay open; only an unfinished transaction is rolled back
+    so the next request on this thread starts from a clean state.
+    """
+    for name in ('db', 'db_readonly'):
+        conn = g.pop(name, None)
+        if conn is not None and conn.in_transaction:
+            logger.warning("Rolling back transaction left open by request")
+            conn.rollback()
+
+
+def close_thread_connections():
+    """Close the connections cached for the calling thread."""
+    for attr in ('reader', 'writer'):
+        conn = _local.__dict__.pop(attr, None)
+        if conn is not None:
+            conn.close()
+
+
+def init_app(app):
+    app.teardown_appcontext(release_connections)
+
+
+def iso_date(schedule_date):
+    """Convert a DD/MM/YYYY schedule date to sortable YYYY-MM-DD.
+
+    Returns None for the "F" placeholder and anything unparseable, so those
+    rows simply fall outside every date range.
+    """
+    try:
+        return datetime.strptime(str(schedule_date).strip(), "%d/%m/%Y").strftime("%Y-%m-%d")
+    except (ValueError, TypeError):
+        return None
+
+
+def next_change_seq(conn, user_id):
+    """Allocate the user's next change sequence number.
+
+    Must run inside the same transaction as the write it stamps: the upsert
+    takes SQLite's write lock, so sequence numbers are handed out (and
+    committed) in order even across workers.
+    """
+    conn.execute('''
+        INSERT INTO user_sync_state (user_id, change_seq) VALUES (?, 1)
+        ON CONFLICT (user_id) DO UPDATE SET change_seq = change_seq + 1
+    ''', (user_id,))
+    return current_change_seq(conn, user_id)
+
+
+def current_change_seq(conn, user_id):
+    row = conn.execute('SELECT change_seq FROM user_sync_state WHERE user_id = ?', (user_id,)).fetchone()
+    return row[0] if row else 0
+
+
+def record_tombstone(conn, user_id, task_id, change_seq):
+    conn.execute('''
+        INSERT OR REPLACE INTO task_tombstones (task_id, user_id, change_seq)
+        VALUES (?, ?, ?)
+    ''', (task_id, user_id, change_seq))
+
+
+def _create_base_schema(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            task_title TEXT NOT NULL,
+            description TEXT,
+            priority TEXT DEFAULT 'Medium',
+            time_required TEXT,
+            schedule_date TEXT,
+            schedule_from TEXT,
+            schedule_to TEXT,
+            tag TEXT DEFAULT 'OTHER',
+            review TEXT,
+            completed INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+
+def _add_task_indexes(conn):
+    # Task list, newest first
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_user_created '
+                 'ON tasks (user_id, created_at DESC)')
+    # Daily summary: equality on schedule_date, ORDER BY priority, schedule_from
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_user_schedule '
+                 'ON tasks (user_id, schedule_date, priority, schedule_from)')
+    # Analytics counts; each index covers its query
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_user_completed '
+                 'ON tasks (user_id, completed)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_user_priority '
+                 'ON tasks (user_id, priority)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_user_tag '
+                 'ON tasks (user_id, tag)')
+
+
+def _add_schedule_iso(conn):
+    # schedule_date stays DD/MM/YYYY for display; schedule_iso is the same
+    # day as YYYY-MM-DD so ranges and ordering work on the string directly.
+    conn.execute('ALTER TABLE tasks ADD COLUMN schedule_iso TEXT')
+    rows = conn.execute("SELECT id, schedule_date FROM tasks "
+                        "WHERE schedule_date IS NOT NULL AND schedule_date != 'F'").fetchall()
+    conn.executemany('UPDATE tasks SET schedule_iso = ? WHERE id = ?',
+                     [(iso_date(row['schedule_date']), row['id']) for row in rows])
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_user_schedule_iso '
+                 'ON tasks (user_id, schedule_iso, schedule_from)')
+
+
+def _add_task_keyset_index(conn):
+    # Keyset pagination orders by (created_at, id); with id in the index the
+    # tie-break needs no separate sort.
+    conn.execute('DROP INDEX IF EXISTS idx_tasks_user_created')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_user_created_id '
+                 'ON tasks (user_id, created_at DESC, id DESC)')
+
+
+def _add_change_tracking(conn):
+    # Every write bumps the user's change_seq and stamps it on the row it
+    # touched; deletes leave a tombstone carrying the seq. Clients then sync
+    # with "everything after seq N".
+    conn.execute('ALTER TABLE tasks ADD COLUMN updated_at TIMESTAMP')
+    conn.execute('ALTER TABLE tasks ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_sync_state (
+            user_id INTEGER PRIMARY KEY,
+            change_seq INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS task_tombstones (
+            task_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            change_seq INTEGER NOT NULL,
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Existing rows all become change 1 of their user
+    conn.execute('UPDATE tasks SET updated_at = created_at, change_seq = 1')
+    conn.execute('''
+        INSERT OR IGNORE INTO user_sync_state (user_id, change_seq)
+        SELECT DISTINCT user_id, 1 FROM tasks WHERE user_id IS NOT NULL
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_user_change_seq ON tasks (user_id, change_seq)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_task_tombstones_user_seq ON task_tombstones (user_id, change_seq)')
+
+
+# One row per (user, dimension): kind 'all' (value ''), 'priority' or 'tag'.
+# NULL priorities/tags are counted under ''.
+_STATS_ROWS = """
+    SELECT 'all' AS kind, '' AS value
+    UNION ALL SELECT 'priority', IFNULL({row}.priority, '')
+    UNION ALL SELECT 'tag', IFNULL({row}.tag, '')
+"""
+_STATS_ADD = """
+    INSERT INTO user_task_stats (user_id, kind, value, total, completed)
+    SELECT NEW.user_id, kind, value, 1, IFNULL(NEW.completed, 0) = 1
+    FROM ({rows}) WHERE NEW.user_id IS NOT NULL
+    ON CONFLICT (user_id, kind, value) DO UPDATE SET
+        total = total + 1, completed = completed + excluded.completed;
+""".format(rows=_STATS_ROWS.format(row='NEW'))
+_STATS_REMOVE = """
+    UPDATE user_task_stats
+    SET total = total - 1, completed = completed - (IFNULL(OLD.completed, 0) = 1)
+    WHERE user_id = OLD.user_id AND (kind, value) IN ({rows});
+    DELETE FROM user_task_stats WHERE user_id = OLD.user_id AND total <= 0;
+""".format(rows=_STATS_ROWS.format(row='OLD'))
+
+
+def _add_task_stats(conn):
+    # Analytics counts maintained by triggers, so reading them is a
+    # primary-key range lookup instead of a scan of the user's tasks.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_task_stats (
+            user_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            value TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, kind, value)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute(f'CREATE TRIGGER IF NOT EXISTS tasks_stats_insert AFTER INSERT ON tasks BEGIN {_STATS_ADD} END')
+    conn.execute(f'CREATE TRIGGER IF NOT EXISTS tasks_stats_delete AFTER DELETE ON tasks BEGIN {_STATS_REMOVE} END')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS tasks_stats_update
+        AFTER UPDATE OF user_id, priority, tag, completed ON tasks
+        WHEN OLD.user_id IS NOT NEW.user_id OR OLD.priority IS NOT NEW.priority
+          OR OLD.tag IS NOT NEW.tag OR OLD.completed IS NOT NEW.completed
+        BEGIN {_STATS_REMOVE} {_STATS_ADD} END
+    ''')
+    rebuild_task_stats(conn)
+
+    # The scan fallback reads all three columns in one pass; this index
+    # covers it and replaces the three single-purpose analytics indexes.
+    for name in ('idx_tasks_user_completed', 'idx_tasks_user_priority', 'idx_tasks_user_tag'):
+        conn.execute(f'DROP INDEX IF EXISTS {name}')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_user_stats '
+                 'ON tasks (user_id, priority, tag, completed)')
+
+
+def rebuild_task_stats(conn):
+    """Recompute user_task_stats from the tasks table."""
+    conn.execute('DELETE FROM user_task_stats')
+    conn.execute('''
+        INSERT INTO user_task_stats (user_id, kind, value, total, completed)
+        SELECT user_id, kind, value, COUNT(*), SUM(done) FROM (
+            SELECT user_id, 'all' AS kind, '' AS value, IFNULL(completed, 0) = 1 AS done FROM tasks
+            UNION ALL
+            SELECT user_id, 'priority', IFNULL(priority, ''), IFNULL(completed, 0) = 1 FROM tasks
+            UNION ALL
+            SELECT user_id, 'tag', IFNULL(tag, ''), IFNULL(completed, 0) = 1 FROM tasks
+        )
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id, kind, value
+    ''')
+
+
+# What one task adds to task_daily_stats, one row per affected day:
+# creation on its created day, planned hours on its scheduled day (or the
+# created day when unscheduled) and completion on its completed day.
+# time_required is free text; anything non-numeric ("F") counts as 0 hours.
+_ROLLUP_CONTRIBUTIONS = """
+    SELECT {row}.user_id AS user_id, date({row}.created_at) AS day, IFNULL({row}.tag, '') AS tag,
+           1 AS created, 0 AS completed, 0.0 AS hours_planned, 0.0 AS hours_completed {source}
+    UNION ALL
+    SELECT {row}.user_id, IFNULL({row}.schedule_iso, date({row}.created_at)), IFNULL({row}.tag, ''),
+           0, 0, IFNULL(CAST({row}.time_required AS REAL), 0), 0.0 {source}
+    UNION ALL
+    SELECT {row}.user_id, date({row}.completed_at), IFNULL({row}.tag, ''),
+           0, 1, 0.0, IFNULL(CAST({row}.time_required AS REAL), 0) {source}
+    WHERE IFNULL({row}.completed, 0) = 1 AND {row}.completed_at IS NOT NULL
+"""
+_ROLLUP_APPLY = """
+    INSERT INTO task_daily_stats (user_id, day, tag, created, completed, hours_planned, hours_completed)
+    SELECT user_id, day, tag, {sign} * created, {sign} * completed, {sign} * hours_planned, {sign} * hours_completed
+    FROM ({rows}) WHERE user_id IS NOT NULL AND day IS NOT NULL
+    ON CONFLICT (user_id, day, tag) DO UPDATE SET
+        created = created + excluded.created,
+        completed = completed + excluded.completed,
+        hours_planned = hours_planned + excluded.hours_planned,
+        hours_completed = hours_completed + excluded.hours_completed;
+"""
+_ROLLUP_ADD = _ROLLUP_APPLY.format(sign=1, rows=_ROLLUP_CONTRIBUTIONS.format(row='NEW', source=''))
+_ROLLUP_REMOVE = _ROLLUP_APPLY.format(sign=-1, rows=_ROLLUP_CONTRIBUTIONS.format(row='OLD', source='')) + """
+    DELETE FROM task_daily_stats
+    WHERE user_id = OLD.user_id AND created = 0 AND completed = 0
+      AND ABS(hours_planned) < 1e-9 AND ABS(hours_completed) < 1e-9;
+"""
+
+
+def _add_daily_rollups(conn):
+    # Per user, day and tag counters behind /api/analytics/timeseries, kept
+    # current by triggers like user_task_stats.
+    conn.execute('ALTER TABLE tasks ADD COLUMN completed_at TIMESTAMP')
+    # The real completion time of existing tasks was never stored; their
+    # last update is the closest thing available.
+    conn.execute('UPDATE tasks SET completed_at = COALESCE(updated_at, created_at) WHERE completed = 1')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS task_daily_stats (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            created INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            hours_planned REAL NOT NULL DEFAULT 0,
+            hours_completed REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day, tag)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute(f'CREATE TRIGGER IF NOT EXISTS tasks_rollup_insert AFTER INSERT ON tasks BEGIN {_ROLLUP_ADD} END')
+    conn.execute(f'CREATE TRIGGER IF NOT EXISTS tasks_rollup_delete AFTER DELETE ON tasks BEGIN {_ROLLUP_REMOVE} END')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS tasks_rollup_update
+        AFTER UPDATE OF user_id, tag, created_at, schedule_iso, time_required, completed, completed_at ON tasks
+        WHEN OLD.user_id IS NOT NEW.user_id OR OLD.tag IS NOT NEW.tag
+          OR OLD.created_at IS NOT NEW.created_at OR OLD.schedule_iso IS NOT NEW.schedule_iso
+          OR OLD.time_required IS NOT NEW.time_required OR OLD.completed IS NOT NEW.completed
+          OR OLD.completed_at IS NOT NEW.completed_at
+        BEGIN {_ROLLUP_REMOVE} {_ROLLUP_ADD} END
+    ''')
+    rebuild_daily_rollups(conn)
+
+
+def rebuild_daily_rollups(conn):
+    """Recompute task_daily_stats from the tasks table (the backfill job)."""
+    conn.execute('DELETE FROM task_daily_stats')
+    conn.execute(f'''
+        INSERT INTO task_daily_stats (user_id, day, tag, created, completed, hours_planned, hours_completed)
+        SELECT user_id, day, tag, SUM(created), SUM(completed), SUM(hours_planned), SUM(hours_completed)
+        FROM ({_ROLLUP_CONTRIBUTIONS.format(row='tasks', source='FROM tasks')})
+        WHERE user_id IS NOT NULL AND day IS NOT NULL
+        GROUP BY user_id, day, tag
+    ''')
+
+
+def _add_summary_cache(conn):
+    # Latest generated summary per user and day, with the hash of the task
+    # fields it was generated from
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS summary_cache (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            prompt_hash TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, day)
+        ) WITHOUT ROWID
+    ''')
+
+
+def _add_task_search(conn):
+    # Full-text index over the searchable task text. External content: the
+    # text itself stays in tasks and the triggers mirror every change.
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+            task_title, description, review,
+            content='tasks', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    ''')
+    add = '''
+        INSERT INTO tasks_fts (rowid, task_title, description, review)
+        VALUES (NEW.id, NEW.task_title, NEW.description, NEW.review);
+    '''
+    remove = '''
+        INSERT INTO tasks_fts (tasks_fts, rowid, task_title, description, review)
+        VALUES ('delete', OLD.id, OLD.task_title, OLD.description, OLD.review);
+    '''
+    conn.execute(f'CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN {add} END')
+    conn.execute(f'CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN {remove} END')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_update
+        AFTER UPDATE OF task_title, description, review ON tasks
+        BEGIN {remove} {add} END
+    ''')
+    conn.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+
+
+def _add_jobs(conn):
+    # Background job queue (see jobs.py). Times are Unix timestamps.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            idempotency_key TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            lease_owner TEXT,
+            lease_expires_at REAL,
+            available_at REAL NOT NULL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            finished_at REAL
+        )
+    ''')
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_idempotency
+        ON jobs (user_id, kind, idempotency_key) WHERE idempotency_key IS NOT NULL
+    ''')
+    # Claiming reads queued jobs by available_at; lease recovery scans the
+    # (few) running ones. Cleanup finds finished jobs by age.
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, available_at)')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_jobs_finished
+        ON jobs (finished_at) WHERE finished_at IS NOT NULL
+    ''')
+
+
+# Append only: a migration's position in this list is its schema version.
+def _scope_task_search(conn):
+    # Index user_id in tasks_fts too, so a search matches only the user's
+    # postings instead of every user's before filtering (searched as the
+    # column filter user_id : "42"). Prefixes up to 6 characters are
+    # indexed so each query term is one prefix-index lookup.
+    for trigger in ('insert', 'delete', 'update'):
+        conn.execute(f'DROP TRIGGER IF EXISTS tasks_fts_{trigger}')
+    conn.execute('DROP TABLE IF EXISTS tasks_fts')
+    conn.execute('''
+        CREATE VIRTUAL TABLE tasks_fts USING fts5(
+            task_title, description, review, user_id,
+            content='tasks', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6'
+        )
+    ''')
+    add = '''
+        INSERT INTO tasks_fts (rowid, task_title, description, review, user_id)
+        VALUES (NEW.id, NEW.task_title, NEW.description, NEW.review, NEW.user_id);
+    '''
+    remove = '''
+        INSERT INTO tasks_fts (tasks_fts, rowid, task_title, description, review, user_id)
+        VALUES ('delete', OLD.id, OLD.task_title, OLD.description, OLD.review, OLD.user_id);
+    '''
+    conn.execute(f'CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN {add} END')
+    conn.execute(f'CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN {remove} END')
+    conn.execute(f'''
+        CREATE TRIGGER tasks_fts_update
+        AFTER UPDATE OF task_title, description, review, user_id ON tasks
+        BEGIN {remove} {add} END
+    ''')
+    conn.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+
+
+MIGRATIONS = [
+    _create_base_schema,
+    _add_task_indexes,
+    _add_schedule_iso,
+    _add_task_keyset_index,
+    _add_change_tracking,
+    _add_task_stats,
+    _add_daily_rollups,
+    _add_summary_cache,
+    _add_task_search,
+    _add_jobs,
+    _scope_task_search,
+]
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate():
+    """Bring the database schema up to the latest version.
+
+    Cheap when the schema is current, so it is safe to call on every worker
+    start. Concurrent workers serialize on an IMMEDIATE transaction and the
+    version is re-read under the lock, so each migration runs exactly once.
+    """
+    target = len(MIGRATIONS)
+    conn = open_connection()
+    try:
+        if schema_version(conn) >= target:
+            return
+
+        conn.isolation_level = None
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            current = schema_version(conn)
+            for version in range(current + 1, target + 1):
+                logger.info(f"Applying schema migration {version}")
+                MIGRATIONS[version - 1](conn)
+                conn.execute(f'PRAGMA user_version = {version}')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    finally:
+        conn.close()
@@ -0,0 +1,22 @@
+"""Gunicorn settings, picked up automatically from the working directory.
+
+The AI routes spend most of their time waiting on Gemini. Threaded workers
+let those waits overlap inside one process, so a few slow LLM requests only
+occupy idle threads and the CRUD endpoints keep answering from the rest.
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+worker_class = 'gthread'
+# Threads per worker, i.e. how many requests (LLM or not) one process holds
+threads = int(os.environ.get('GUNICORN_THREADS', 256))
+# A request may chain several LLM calls; see LLM_REQUEST_DEADLINE
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+keepalive = 5
+
+
+def post_worker_init(worker):
+    # The app (and every job handler) is loaded now; resume queued jobs
+    import jobs
+    jobs.start()
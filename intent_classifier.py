@@ -0,0 +1,112 @@
+"""Local rule-based intent classifier.
+
+Scores an utterance against the example action verbs listed in the
+classification prompts so confidently-classified inputs can skip the LLM
+classification call. Phrases are matched longest-first as whole words; a
+phrase that opens the utterance counts double, since commands normally lead
+with their verb. Cues elsewhere in the utterance that point at another
+intent ("add a note to the gym task") score against the leading verb, so
+such inputs fall below the threshold and go to the LLM.
+
+Shadow mode is the default: the LLM is still used for every request and
+the local prediction is only compared against it, so the agreement rate per
+confidence bucket can be read from /api/metrics before a threshold is
+trusted (INTENT_CLASSIFIER_SHADOW=0 then enforces it).
+"""
+import os
+import re
+import logging
+from collections import namedtuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+INTENT_CLASSIFIER_THRESHOLD = float(os.environ.get('INTENT_CLASSIFIER_THRESHOLD', 0.8))
+INTENT_CLASSIFIER_SHADOW = os.environ.get('INTENT_CLASSIFIER_SHADOW', '1') == '1'
+# Score of each cue match, the same as a one-word leading verb
+CUE_WEIGHT = 2
+
+# Politeness and filler allowed before the leading verb
+_LEAD_IN = re.compile(
+    r"^\s*(?:(?:please|hey|hi|ok|okay|so|can you|could you|would you|will you|"
+    r"i want to|i need to|i'd like to|i would like to|let's|lets|go ahead and)[\s,]+)*",
+    re.IGNORECASE
+)
+
+Prediction = namedtuple('Prediction', ['label', 'confidence'])
+
+
+def parse_phrases(examples):
+    """Turn a prompt's "verb,verb (note),..." example list into phrases."""
+    phrases = []
+    for item in examples.split(','):
+        phrase = re.sub(r'\(.*?\)', '', item).strip(' .').lower()
+        phrase = re.sub(r'\s+', ' ', phrase)
+        if phrase:
+            phrases.append(phrase)
+    return phrases
+
+
+class IntentClassifier:
+    def __init__(self, intents, cues=None, threshold=INTENT_CLASSIFIER_THRESHOLD):
+        """``intents`` maps each label to its comma-separated example verbs.
+
+        ``cues`` maps labels to regular expressions that point at them
+        anywhere in the utterance; each match adds CUE_WEIGHT.
+        """
+        self.threshold = threshold
+        self.cues = [(label, re.compile(cue, re.IGNORECASE))
+                     for label, patterns in (cues or {}).items() for cue in patterns]
+        self.phrase_labels = {}
+        for label, examples in intents.items():
+            for phrase in parse_phrases(examples):
+                self.phrase_labels.setdefault(phrase, label)
+
+        # Longest alternatives first so "add review" wins over "add"
+        alternatives = sorted(self.phrase_labels, key=len, reverse=True)
+        self.pattern = re.compile(
+            r'\b(' + '|'.join(re.escape(p).replace(r'\ ', r'\s+') for p in alternatives) + r')\b',
+            re.IGNORECASE
+        )
+
+    def classify(self, text):
+        lead = _LEAD_IN.match(text).end()
+        scores = {}
+        leading_label = None
+        for match in self.pattern.finditer(text):
+            phrase = re.sub(r'\s+', ' ', match.group(1).lower())
+            label = self.phrase_labels[phrase]
+            weight = len(phrase.split())
+            if match.start() == lead:
+                leading_label = label
+                weight *= 2
+            scores[label] = scores.get(label, 0) + weight
+        for label, cue in self.cues:
+            if cue.search(text):
+                scores[label] = scores.get(label, 0) + CUE_WEIGHT
+
+        if not scores:
+            return Prediction(None, 0.0)
+
+        label = max(scores, key=scores.get)
+        confidence = scores[label] / sum(scores.values())
+        if leading_label != label:
+            confidence *= 0.7
+        return Prediction(label, round(confidence, 3))
+
+    def is_confident(self, prediction):
+        return prediction.label is not None and prediction.confidence >= self.threshold
+
+
+def record_shadow(prediction, llm_intent):
+    """Compare a local prediction with the LLM's answer for the same input."""
+    bucket = f"{int(prediction.confidence * 10) / 10:.1f}"
+    agreed = prediction.label == llm_intent
+    metrics.incr('intent_classifier.shadow.compared')
+    metrics.incr(f'intent_classifier.shadow.bucket_{bucket}.compared')
+    if agreed:
+        metrics.incr('intent_classifier.shadow.agreed')
+        metrics.incr(f'intent_classifier.shadow.bucket_{bucket}.agreed')
+    else:
+        logger.debug(f"Local intent {prediction.label} ({prediction.confidence}) != LLM intent {llm_intent}")
@@ -0,0 +1,267 @@
+"""Background jobs for slow LLM work, queued in the ``jobs`` table.
+
+A route enqueues a job and answers 202 Accepted with its id. A pool of
+worker threads in each web process runs it, or ``flask run-jobs`` runs it
+in a separate process. Web processes start their pool with ``start()``
+(gunicorn's post_worker_init hook), which first queues again the jobs a
+restart left behind. The client polls GET /api/jobs/<id>, optionally
+with ``?wait=<s>`` to be answered as soon as the job finishes.
+
+- A job carries the user id and a JSON payload; the handler registered for
+  its kind turns them into a JSON result.
+- Jobs enqueued with the same idempotency key (per user and kind) are one
+  job; re-enqueueing a failed one retries it.
+- A worker claims a job with a lease. Jobs whose lease expires (their
+  worker died or was restarted) are queued again, up to JOB_MAX_ATTEMPTS
+  attempts in all, so queued work survives restarts.
+- Transient LLM failures are retried with backoff; any other error fails
+  the job at once.
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import logging
+import threading
+
+import db
+import metrics
+from llm_resilience import LLMUnavailable, is_transient, backoff_delay
+
+logger = logging.getLogger(__name__)
+
+# Worker threads per web process; 0 leaves the jobs to `flask run-jobs`
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 120))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1.0))
+# Finished jobs are deleted after this many seconds
+JOB_RETENTION = float(os.environ.get('JOB_RETENTION', 24 * 3600))
+# Longest a GET /api/jobs/<id>?wait= request is held open
+JOB_MAX_WAIT = float(os.environ.get('JOB_MAX_WAIT', 20))
+
+FINISHED = ('succeeded', 'failed')
+
+_handlers = {}
+_workers = []
+_workers_pid = None
+_workers_lock = threading.Lock()
+# Notified when a job is enqueued or finishes in this process
+_changed = threading.Condition()
+
+
+def handler(kind):
+    """Register ``fn(conn, user_id, payload) -> result`` for a job kind."""
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def to_dict(row):
+    return {
+        "id": row['id'],
+        "kind": row['kind'],
+        "status": row['status'],
+        "attempts": row['attempts'],
+        "result": json.loads(row['result']) if row['result'] is not None else None,
+        "error": row['error'],
+        "created_at": row['created_at'],
+        "finished_at": row['finished_at'],
+    }
+
+
+def _notify():
+    with _changed:
+        _changed.notify_all()
+
+
+def enqueue(conn, user_id, kind, payload, idempotency_key=None):
+    """Queue a job, or return the existing one with this idempotency key."""
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    conn.execute('''
+        INSERT INTO jobs (id, user_id, kind, payload, idempotency_key, available_at, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, kind, idempotency_key) WHERE idempotency_key IS NOT NULL
+        DO UPDATE SET status = 'queued', attempts = 0, error = NULL, finished_at = NULL,
+                      available_at = excluded.available_at, updated_at = excluded.updated_at
+        WHERE jobs.status = 'failed'
+    ''', (job_id, user_id, kind, json.dumps(payload), idempotency_key, now, now, now))
+    if idempotency_key is None:
+        row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    else:
+        row = conn.execute('SELECT * FROM jobs WHERE user_id = ? AND kind = ? AND idempotency_key = ?',
+                           (user_id, kind, idempotency_key)).fetchone()
+    conn.commit()
+
+    metrics.incr('jobs.enqueued' if row['id'] == job_id else 'jobs.deduplicated')
+    ensure_workers()
+    _notify()
+    return row
+
+
+def get(conn, user_id, job_id):
+    return conn.execute('SELECT * FROM jobs WHERE id = ? AND user_id = ?', (job_id, user_id)).fetchone()
+
+
+def wait_for(conn, user_id, job_id, timeout):
+    """The job once it has finished, or as it is after ``timeout`` seconds.
+
+    Jobs finishing in this process wake the wait at once; others are
+    noticed within JOB_POLL_INTERVAL.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        row = get(conn, user_id, job_id)
+        remaining = deadline - time.monotonic()
+        if row is None or row['status'] in FINISHED or remaining <= 0:
+            return row
+        with _changed:
+            _changed.wait(min(remaining, JOB_POLL_INTERVAL))
+
+
+def claim(conn, owner, now=None):
+    """Lease the oldest runnable job to ``owner``; None if there is none."""
+    now = now or time.time()
+    row = conn.execute('''
+        UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_owner = ?,
+                        lease_expires_at = ?, updated_at = ?
+        WHERE id = (
+            SELECT id FROM jobs WHERE status = 'queued' AND available_at <= ?
+            ORDER BY available_at LIMIT 1
+        )
+        RETURNING *
+    ''', (owner, now + JOB_LEASE_SECONDS, now, now)).fetchone()
+    conn.commit()
+    return row
+
+
+def recover(conn, now=None):
+    """Queue again the jobs whose lease expired; drop old finished jobs."""
+    now = now or time.time()
+    recovered = conn.execute('''
+        UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                        error = CASE WHEN attempts >= ? THEN 'Worker lost' ELSE error END,
+                        finished_at = CASE WHEN attempts >= ? THEN ? END,
+                        lease_owner = NULL, available_at = ?, updated_at = ?
+        WHERE status = 'running' AND lease_expires_at <= ?
+    ''', (JOB_MAX_ATTEMPTS, JOB_MAX_ATTEMPTS, JOB_MAX_ATTEMPTS, now, now, now, now)).rowcount
+    conn.execute('DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at <= ?', (now - JOB_RETENTION,))
+    conn.commit()
+    if recovered:
+        metrics.incr('jobs.leases_expired', recovered)
+        logger.warning(f"Recovered {recovered} job(s) from expired leases")
+    return recovered
+
+
+def _finish(conn, job, owner, **fields):
+    fields['updated_at'] = time.time()
+    assignments = ', '.join(f'{name} = ?' for name in fields)
+    updated = conn.execute(f'''
+        UPDATE jobs SET {assignments}, lease_owner = NULL
+        WHERE id = ? AND lease_owner = ? AND status = 'running'
+    ''', (*fields.values(), job['id'], owner)).rowcount
+    conn.commit()
+    if not updated:
+        # The lease expired and the job was handed on; this run's outcome
+        # is dropped
+        metrics.incr('jobs.lease_lost')
+        logger.warning(f"Job {job['id']} finished after losing its lease")
+
+
+def run(conn, job, owner):
+    """Run a claimed job and record its outcome."""
+    started = time.monotonic()
+    try:
+        result = _handlers[job['kind']](conn, job['user_id'], json.loads(job['payload']))
+    except Exception as e:
+        conn.rollback()
+        retry = (isinstance(e, LLMUnavailable) or is_transient(e)) and job['attempts'] < JOB_MAX_ATTEMPTS
+        if retry:
+            metrics.incr('jobs.retried')
+            _finish(conn, job, owner, status='queued', error=str(e),
+                    available_at=time.time() + backoff_delay(job['attempts'], base=1.0, cap=30.0))
+        else:
+            metrics.incr('jobs.failed')
+            logger.error(f"Job {job['id']} ({job['kind']}) failed: {e}")
+            _finish(conn, job, owner, status='failed', error=str(e), finished_at=time.time())
+    else:
+        metrics.incr('jobs.succeeded')
+        _finish(conn, job, owner, status='succeeded', result=json.dumps(result), error=None,
+                finished_at=time.time())
+    metrics.observe(f'jobs.{job["kind"]}.run_ms', (time.monotonic() - started) * 1000)
+    _notify()
+
+
+def work(stop=None):
+    """Claim and run jobs until ``stop`` is set; one thread's loop."""
+    owner = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    conn = db.open_connection()
+    try:
+        while stop is None or not stop.is_set():
+            try:
+                job = claim(conn, owner)
+                if job is None:
+                    recover(conn)
+                    with _changed:
+                        _changed.wait(JOB_POLL_INTERVAL)
+                    continue
+                run(conn, job, owner)
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Job worker error: {e}")
+                time.sleep(JOB_POLL_INTERVAL)
+    finally:
+        conn.close()
+
+
+def ensure_workers(count=JOB_WORKERS):
+    """Start this process's worker threads if they are not running yet."""
+    global _workers_pid
+    if count <= 0:
+        return
+    # Threads do not survive fork, so each worker process starts its own
+    with _workers_lock:
+        if _workers_pid == os.getpid():
+            return
+        _workers.clear()
+        for i in range(count):
+            thread = threading.Thread(target=work, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            _workers.append(thread)
+        _workers_pid = os.getpid()
+
+
+def start(count=JOB_WORKERS):
+    """Queue again the jobs a restart left behind and start the workers.
+
+    Called once a web process has loaded the app (and so registered every
+    handler), so queued work resumes without waiting for a client.
+    """
+    conn = db.open_connection()
+    try:
+        recover(conn)
+    finally:
+        conn.close()
+    ensure_workers(count)
+
+
+def serve(count):
+    """Run ``count`` worker threads until interrupted (Ctrl-C)."""
+    stop = threading.Event()
+    threads = [threading.Thread(target=work, args=(stop,), name=f'job-worker-{i}', daemon=True)
+               for i in range(count)]
+    for thread in threads:
+        thread.start()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop.set()
+        _notify()
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,361 @@
+"""Two-tier cache for LLM responses.
+
+Responses are keyed on the prompt template name and version plus a hash of
+the whitespace-normalized prompt. A bounded in-process LRU answers repeats
+within a worker; a SQLite file shared by all workers answers repeats across
+them. Prompts that embed the current date/time pass those strings as
+``volatile`` so they are masked out of the key and the entry is bucketed by
+calendar day instead: answers are reused all day but never after midnight.
+Only answers the caller can use are stored: callers pass a ``validate``
+check, and an answer it rejects is returned to them but not cached.
+
+Identical prompts in flight at the same time are called once (single
+flight). Within a worker, later callers wait on the first caller's future.
+Across workers, the first takes a short-lived lease row for the key in the
+shared SQLite file, and the others poll for its answer in the cache
+instead of making their own call. If the lease holder fails or its lease
+runs out, a waiter takes over. Waiting never outlasts the caller's own
+deadline: a waiter still without an answer then raises DeadlineExceeded.
+"""
+import os
+import re
+import time
+import hashlib
+import logging
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from datetime import date
+
+from langchain_core.messages import AIMessage
+
+import db
+import metrics
+from llm_exec import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_DB = os.environ.get('LLM_CACHE_DB', 'llm_cache.db')
+LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL', 24 * 3600))
+LLM_CACHE_MEMORY_ENTRIES = int(os.environ.get('LLM_CACHE_MEMORY_ENTRIES', 512))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 20000))
+
+# How long one worker may hold a prompt before others stop waiting for it
+LLM_CACHE_LEASE_SECONDS = float(os.environ.get('LLM_CACHE_LEASE_SECONDS', 30))
+LLM_CACHE_LEASE_POLL = float(os.environ.get('LLM_CACHE_LEASE_POLL', 0.1))
+
+# Run size/TTL eviction on the shared table once every this many writes
+_EVICT_EVERY = 100
+
+
+def normalize_prompt(prompt, volatile=()):
+    for value in volatile:
+        if value:
+            prompt = prompt.replace(value, '<now>')
+    return re.sub(r'\s+', ' ', prompt).strip()
+
+
+def cacheable(response, validate=None):
+    """Whether an LLM answer may be cached: non-empty text that ``validate``
+    (if given) accepts. A check that raises rejects the answer."""
+    if not isinstance(response.content, str) or not response.content:
+        return False
+    if validate is None:
+        return True
+    try:
+        return bool(validate(response))
+    except Exception as e:
+        logger.debug(f"LLM answer not cached, it did not validate: {e}")
+        return False
+
+
+def cache_key(prompt, template, version, volatile=()):
+    parts = [template, str(version)]
+    if volatile:
+        parts.append(date.today().isoformat())
+    parts.append(normalize_prompt(prompt, volatile))
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path=LLM_CACHE_DB, ttl=LLM_CACHE_TTL,
+                 memory_entries=LLM_CACHE_MEMORY_ENTRIES, max_entries=LLM_CACHE_MAX_ENTRIES,
+                 lease_seconds=LLM_CACHE_LEASE_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.lease_seconds = lease_seconds
+        self._memory = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self._init_table()
+
+    def _init_table(self):
+        try:
+            conn = db.open_connection(path=self.path)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache (created_at)')
+            # Prompts a worker is calling the LLM for right now
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS llm_inflight (
+                    key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Error initializing LLM cache: {e}")
+
+    def _conn(self):
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.__dict__.clear()
+            self._local.pid = os.getpid()
+        if not hasattr(self._local, 'conn'):
+            self._local.conn = db.open_connection(path=self.path)
+        return self._local.conn
+
+    def _memory_get(self, key, now):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            content, expires_at = entry
+            if expires_at <= now:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return content
+
+    def _memory_put(self, key, content, expires_at):
+        with self._lock:
+            self._memory[key] = (content, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_get(self, key, now):
+        try:
+            row = self._conn().execute('SELECT content, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?',
+                                       (key, now)).fetchone()
+        except Exception as e:
+            logger.error(f"Error reading LLM cache: {e}")
+            return None
+        if row is None:
+            return None
+        self._memory_put(key, row['content'], row['expires_at'])
+        return row['content']
+
+    def get(self, key):
+        now = time.time()
+        content = self._memory_get(key, now)
+        if content is not None:
+            metrics.incr('llm_cache.memory_hits')
+            return content
+
+        content = self._disk_get(key, now)
+        if content is not None:
+            metrics.incr('llm_cache.disk_hits')
+            return content
+
+        metrics.incr('llm_cache.misses')
+        return None
+
+    def put(self, key, content):
+        now = time.time()
+        expires_at = now + self.ttl
+        self._memory_put(key, content, expires_at)
+        try:
+            conn = self._conn()
+            conn.execute('INSERT OR REPLACE INTO llm_cache (key, content, created_at, expires_at) VALUES (?, ?, ?, ?)',
+                         (key, content, now, expires_at))
+            conn.commit()
+            with self._lock:
+                self._writes += 1
+                evict = self._writes % _EVICT_EVERY == 0
+            if evict:
+                self.evict(conn, now)
+        except Exception as e:
+            logger.error(f"Error writing LLM cache: {e}")
+
+    def evict(self, conn=None, now=None):
+        conn = conn or self._conn()
+        now = now or time.time()
+        expired = conn.execute('DELETE FROM llm_cache WHERE expires_at <= ?', (now,)).rowcount
+        overflow = conn.execute('''
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_entries,)).rowcount
+        conn.execute('DELETE FROM llm_inflight WHERE expires_at <= ?', (now,))
+        conn.commit()
+        metrics.incr('llm_cache.evictions', expired + overflow)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        conn = self._conn()
+        conn.execute('DELETE FROM llm_cache')
+        conn.commit()
+
+    def _acquire_lease(self, key, owner):
+        """Claim the key for this caller unless another holds a live lease."""
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute('''
+            INSERT INTO llm_inflight (key, owner, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+            WHERE llm_inflight.expires_at <= ?
+            RETURNING owner
+        ''', (key, owner, now + self.lease_seconds, now)).fetchone()
+        conn.commit()
+        return row is not None
+
+    def _release_lease(self, key, owner):
+        try:
+            conn = self._conn()
+            conn.execute('DELETE FROM llm_inflight WHERE key = ? AND owner = ?', (key, owner))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error releasing LLM cache lease: {e}")
+
+    def _wait_for_lease(self, key, until):
+        """Poll until the lease holder's answer is cached; None if the lease
+        ends without one or ``until`` passes."""
+        conn = self._conn()
+        while time.time() < until:
+            time.sleep(LLM_CACHE_LEASE_POLL)
+            now = time.time()
+            content = self._disk_get(key, now)
+            if content is not None:
+                return content
+            try:
+                held = conn.execute('SELECT 1 FROM llm_inflight WHERE key = ? AND expires_at > ?',
+                                    (key, now)).fetchone()
+            except Exception as e:
+                logger.error(f"Error reading LLM cache lease: {e}")
+                return None
+            if held is None:
+                return None
+        return None
+
+    def _load(self, llm, key, prompt, validate, deadline_at=None):
+        """Answer a cache miss, calling the LLM only if no other worker is."""
+        owner = uuid.uuid4().hex
+        give_up_at = time.time() + self.lease_seconds
+        if deadline_at is not None:
+            give_up_at = min(give_up_at, deadline_at)
+        while time.time() < give_up_at:
+            try:
+                leased = self._acquire_lease(key, owner)
+            except Exception as e:
+                logger.error(f"Error taking LLM cache lease: {e}")
+                break
+            if leased:
+                try:
+                    # The previous holder may have finished just before
+                    content = self._disk_get(key, time.time())
+                    if content is not None:
+                        return AIMessage(content=content)
+                    return self._call(llm, key, prompt, validate)
+                finally:
+                    self._release_lease(key, owner)
+
+            metrics.incr('llm_cache.lease_waits')
+            content = self._wait_for_lease(key, give_up_at)
+            if content is not None:
+                metrics.incr('llm_cache.lease_hits')
+                return AIMessage(content=content)
+
+        if deadline_at is not None and time.time() >= deadline_at:
+            metrics.incr('llm_cache.lease_timeouts')
+            raise DeadlineExceeded("Gave up waiting for another worker's answer to the same prompt")
+        return self._call(llm, key, prompt, validate)
+
+    def _call(self, llm, key, prompt, validate):
+        response = llm.invoke(prompt)
+        if cacheable(response, validate):
+            self.put(key, response.content)
+        else:
+            metrics.incr('llm_cache.rejected')
+        return response
+
+    def invoke(self, llm, prompt, template, version, volatile=(), validate=None, deadline=None):
+        """``llm.invoke(prompt)`` through the cache; returns an AIMessage.
+
+        ``validate(response)`` decides whether a fresh answer is cached.
+        ``deadline`` is how many seconds the caller can wait: waiting for the
+        same prompt in flight elsewhere stops then with DeadlineExceeded.
+        """
+        deadline_at = None if deadline is None else time.time() + deadline
+        key = cache_key(prompt, template, version, volatile)
+        content = self.get(key)
+        if content is not None:
+            return AIMessage(content=content)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            # Same prompt already in flight in this worker: share its answer
+            metrics.incr('llm_cache.coalesced')
+            try:
+                return future.result(timeout=deadline)
+            except FutureTimeout:
+                raise DeadlineExceeded("Gave up waiting for the same prompt in flight in this worker") from None
+
+        try:
+            response = self._load(llm, key, prompt, validate, deadline_at)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def batch(self, llm, calls, max_concurrency, validate=None):
+        """``llm.batch`` through the cache for ``(prompt, template, version,
+        volatile)`` calls; ``validate`` is applied to each answer as in invoke.
+
+        Cached answers are served directly and only the misses go to the LLM,
+        at most ``max_concurrency`` at a time. Results are in call order; a
+        call that failed has its exception in place of an AIMessage.
+        """
+        keys = [cache_key(prompt, template, version, volatile) for prompt, template, version, volatile in calls]
+        results = [None] * len(calls)
+        misses = []
+        for i, key in enumerate(keys):
+            content = self.get(key)
+            if content is not None:
+                results[i] = AIMessage(content=content)
+            else:
+                misses.append(i)
+
+        if misses:
+            responses = llm.batch([calls[i][0] for i in misses], config={'max_concurrency': max_concurrency},
+                                  return_exceptions=True)
+            for i, response in zip(misses, responses):
+                results[i] = response
+                if isinstance(response, Exception):
+                    continue
+                if cacheable(response, validate):
+                    self.put(keys[i], response.content)
+                else:
+                    metrics.incr('llm_cache.rejected')
+        return results
@@ -0,0 +1,64 @@
+"""Concurrent execution of independent LLM calls within one request.
+
+LLM calls are network-bound, so running the independent ones of a request on
+a small shared thread pool makes the request take as long as its slowest
+call instead of the sum of all of them.
+"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+
+logger = logging.getLogger(__name__)
+
+LLM_POOL_SIZE = int(os.environ.get('LLM_POOL_SIZE', 64))
+LLM_REQUEST_DEADLINE = float(os.environ.get('LLM_REQUEST_DEADLINE', 30))
+# Most calls one llm.batch request sends at a time
+LLM_BATCH_CONCURRENCY = int(os.environ.get('LLM_BATCH_CONCURRENCY', 8))
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a group of calls does not finish within its deadline."""
+
+
+def get_executor():
+    # Threads do not survive fork, so each worker process builds its own pool.
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=LLM_POOL_SIZE, thread_name_prefix='llm')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def run_concurrently(*calls, deadline=None):
+    """Run zero-argument callables concurrently and return their results in order.
+
+    If any call raises, or the deadline (seconds, default LLM_REQUEST_DEADLINE)
+    passes first, siblings that have not started are cancelled and the error
+    is raised. Calls already running cannot be interrupted; their results are
+    discarded.
+    """
+    if len(calls) == 1:
+        return [calls[0]()]
+
+    deadline = LLM_REQUEST_DEADLINE if deadline is None else deadline
+    started = time.monotonic()
+    futures = [get_executor().submit(call) for call in calls]
+    done, pending = wait(futures, timeout=deadline, return_when=FIRST_EXCEPTION)
+
+    failed = next((f for f in futures if f in done and f.exception() is not None), None)
+    if failed is not None or pending:
+        for future in pending:
+            future.cancel()
+        if failed is not None:
+            raise failed.exception()
+        elapsed = time.monotonic() - started
+        raise DeadlineExceeded(f"{len(pending)} of {len(futures)} LLM calls still running after {elapsed:.1f}s")
+
+    return [future.result() for future in futures]
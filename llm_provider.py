@@ -0,0 +1,214 @@
+"""LLM provider selection: live Gemini, record, replay or stub.
+
+Set ``LLM_PROVIDER`` to choose:
+
+- ``live``   (default) ChatGoogleGenerativeAI
+- ``record`` live calls, each response and its latency appended to the
+  cassette file
+- ``replay`` answers from the cassette only, no network or API key needed
+- ``stub``   canned answers shaped like the app's prompts, for smoke tests;
+  ``LLM_STUB_ERROR_RATE`` makes that share of calls fail with a 503
+
+A cassette (``LLM_CASSETTE``, JSON lines) holds one record per call:
+``{"hash", "prompt", "content", "latency"}``. Prompts are hashed after
+masking the current-date strings the app embeds, so a cassette recorded on
+one day replays on another.
+
+Replay and stub sleep according to ``LLM_REPLAY_LATENCY`` /
+``LLM_STUB_LATENCY``:
+
+- ``recorded``              the latency observed when recording (replay only)
+- ``empirical``             a random latency from the whole cassette
+- ``none``                  no delay
+- ``fixed:<s>``             a constant delay in seconds
+- ``lognormal:<median>,<sigma>``  a synthetic long-tailed distribution
+
+All providers are LangChain chat models, so invoke/stream/batch/ainvoke
+work the same for each of them.
+"""
+import os
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import logging
+import threading
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+LLM_PROVIDER = os.environ.get('LLM_PROVIDER', 'live')
+LLM_MODEL = os.environ.get('LLM_MODEL', 'gemini-1.5-flash')
+LLM_CASSETTE = os.environ.get('LLM_CASSETTE', 'llm_cassette.jsonl')
+LLM_REPLAY_LATENCY = os.environ.get('LLM_REPLAY_LATENCY', 'recorded')
+LLM_STUB_LATENCY = os.environ.get('LLM_STUB_LATENCY', 'none')
+# Share of stub calls that fail with a transient 503, for fault injection
+LLM_STUB_ERROR_RATE = float(os.environ.get('LLM_STUB_ERROR_RATE', 0))
+# Transport timeout of live calls. ResilientLLM enforces the per-call
+# deadlines and retries; this only ends calls it has stopped waiting for.
+LLM_CLIENT_TIMEOUT = float(os.environ.get('LLM_CLIENT_TIMEOUT', 60))
+
+# Date/time strings the app's prompts embed for "today"
+_VOLATILE = [
+    re.compile(r'\b(?:Mon|Tues|Wednes|Thurs|Fri|Satur|Sun)day, \d{2} [A-Z][a-z]+ \d{4}, \d{2}:\d{2}\b'),
+    re.compile(r'(today is )\d{2}/\d{2}/\d{4}'),
+]
+
+
+class CassetteMiss(KeyError):
+    """Replay found no recorded response for a prompt."""
+
+
+class StubUnavailable(Exception):
+    """Injected stub failure, shaped like a provider's 503."""
+    code = 503
+
+
+def prompt_text(messages):
+    return "\n".join(f"{message.type}: {message.content}" for message in messages)
+
+
+def prompt_hash(messages):
+    text = prompt_text(messages)
+    for pattern in _VOLATILE:
+        text = pattern.sub(lambda m: (m.group(1) if m.groups() else '') + '<now>', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def sample_latency(spec, recorded=None, population=()):
+    """Seconds to wait for one call, according to a latency spec string."""
+    kind, _, args = spec.partition(':')
+    if kind == 'none':
+        return 0.0
+    if kind == 'recorded':
+        return recorded or 0.0
+    if kind == 'empirical':
+        return random.choice(population) if population else (recorded or 0.0)
+    if kind == 'fixed':
+        return float(args)
+    if kind == 'lognormal':
+        median, sigma = (float(x) for x in args.split(','))
+        return random.lognormvariate(math.log(median), sigma)
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+def _result(content):
+    return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+
+class RecordingChatModel(BaseChatModel):
+    """Passes calls to ``inner`` and appends every response to the cassette."""
+    inner: BaseChatModel
+    cassette: str = LLM_CASSETTE
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self):
+        return 'recording'
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs):
+        started = time.monotonic()
+        response = self.inner.invoke(messages, stop=stop, **kwargs)
+        latency = time.monotonic() - started
+        record = {
+            'hash': prompt_hash(messages),
+            'prompt': prompt_text(messages)[:500],
+            'content': response.content,
+            'latency': round(latency, 4),
+        }
+        with self._lock, open(self.cassette, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+        return _result(response.content)
+
+
+class ReplayChatModel(BaseChatModel):
+    """Answers from a recorded cassette with real or synthetic latency."""
+    cassette: str = LLM_CASSETTE
+    latency: str = LLM_REPLAY_LATENCY
+    _records: dict = PrivateAttr(default_factory=dict)
+    _latencies: list = PrivateAttr(default_factory=list)
+
+    def model_post_init(self, __context):
+        with open(self.cassette, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    # Last recording of a prompt wins
+                    self._records[record['hash']] = record
+                    self._latencies.append(record.get('latency', 0.0))
+        logger.info(f"Loaded {len(self._records)} recorded LLM responses from {self.cassette}")
+
+    @property
+    def _llm_type(self):
+        return 'replay'
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs):
+        record = self._records.get(prompt_hash(messages))
+        if record is None:
+            raise CassetteMiss(f"No recorded response for prompt: {prompt_text(messages)[:200]!r}")
+        time.sleep(sample_latency(self.latency, record.get('latency'), self._latencies))
+        return _result(record['content'])
+
+
+class StubChatModel(BaseChatModel):
+    """Canned answers shaped like what each of the app's prompts expects."""
+    latency: str = LLM_STUB_LATENCY
+    error_rate: float = LLM_STUB_ERROR_RATE
+
+    @property
+    def _llm_type(self):
+        return 'stub'
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs):
+        time.sleep(sample_latency(self.latency))
+        if self.error_rate and random.random() < self.error_rate:
+            raise StubUnavailable("Injected stub failure")
+        return _result(self.respond(prompt_text(messages)))
+
+    @staticmethod
+    def respond(prompt):
+        if 'JSON' in prompt or '"intent"' in prompt:
+            return "```json\n" + json.dumps({
+                "intent": "CREATE_TASK",
+                "task_title": "Stub task",
+                "description": "Stub task description",
+                "time_required": "1",
+                "schedule_date": "F",
+                "schedule_from": "F",
+                "schedule_to": "F",
+                "tag": "OTHER",
+                "priority": "Medium",
+                "scheduled_date": time.strftime("%d/%m/%Y"),
+            }) + "\n```"
+        if 'Classify' in prompt:
+            return "CREATE_TASK"
+        if 'Extract the exact task title' in prompt:
+            return "Stub task"
+        return "This is a stub response."
+
+
+def make_llm(api_key, provider=LLM_PROVIDER):
+    if provider == 'stub':
+        return StubChatModel()
+    if provider == 'replay':
+        return ReplayChatModel()
+
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    live = ChatGoogleGenerativeAI(model=LLM_MODEL, google_api_key=api_key,
+                                  timeout=LLM_CLIENT_TIMEOUT, max_retries=0)
+    if provider == 'record':
+        return RecordingChatModel(inner=live)
+    if provider != 'live':
+        raise ValueError(f"Unknown LLM_PROVIDER: {provider}")
+    return live
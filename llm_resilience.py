@@ -0,0 +1,442 @@
+"""Deadlines, retries, a circuit breaker and a bulkhead around LLM calls.
+
+Every LLM call goes through a ``ResilientLLM`` so a slow or failing
+provider cannot tie up the web workers:
+
+- Each call has a deadline set by its kind (``classify`` is short,
+  ``classify_extract`` and ``extract`` longer, ``summary`` longest). The deadline covers retries too. The caller stops
+  waiting when it passes; the abandoned attempt finishes in the background.
+- Transient errors (timeouts, 429/5xx, connection errors) are retried with
+  full-jitter exponential backoff while the deadline allows.
+- A circuit breaker watches the outcome of recent attempts. Once their
+  error rate crosses LLM_BREAKER_ERROR_RATE it opens, and calls fail at
+  once with ``CircuitOpen`` for LLM_BREAKER_COOLDOWN seconds. Then a single
+  probe call decides whether it closes again.
+- A bulkhead caps the calls in flight per worker process at
+  LLM_MAX_IN_FLIGHT. Abandoned attempts keep their slot until they really
+  finish, so a hung provider fills the bulkhead, not the thread pool. A
+  call finding it full waits at most LLM_BULKHEAD_WAIT (or until its
+  deadline, with ``bulkhead_wait=None``) before ``BulkheadFull``.
+- Calls of the kinds in LLM_HEDGE_KINDS (opt-in, e.g.
+  ``classify,classify_extract``, the kinds on the voice and assistant
+  paths) are hedged. If a call has not answered within the p95 latency observed for
+  its kind, a duplicate is sent and whichever answers first wins. The
+  loser's answer is discarded: a running HTTP call cannot be interrupted
+  from another thread, so it is only cancelled if it has not started. A
+  token bucket keeps hedges to LLM_HEDGE_BUDGET of the calls. Hedge
+  metrics are per kind: ``llm.<kind>.hedge.fired``, ``.won`` and
+  ``.over_budget``.
+"""
+import os
+import time
+import queue
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import metrics
+from llm_exec import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+# Seconds allowed per call kind, including retries
+LLM_DEADLINES = {
+    'classify': float(os.environ.get('LLM_DEADLINE_CLASSIFY', 8)),
+    'classify_extract': float(os.environ.get('LLM_DEADLINE_CLASSIFY_EXTRACT', 12)),
+    'extract': float(os.environ.get('LLM_DEADLINE_EXTRACT', 15)),
+    'summary': float(os.environ.get('LLM_DEADLINE_SUMMARY', 45)),
+    'default': float(os.environ.get('LLM_DEADLINE_DEFAULT', 20)),
+}
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 2))
+LLM_BACKOFF_BASE = float(os.environ.get('LLM_BACKOFF_BASE', 0.25))
+LLM_BACKOFF_MAX = float(os.environ.get('LLM_BACKOFF_MAX', 2.0))
+LLM_BREAKER_WINDOW = float(os.environ.get('LLM_BREAKER_WINDOW', 30))
+LLM_BREAKER_MIN_CALLS = int(os.environ.get('LLM_BREAKER_MIN_CALLS', 10))
+LLM_BREAKER_ERROR_RATE = float(os.environ.get('LLM_BREAKER_ERROR_RATE', 0.5))
+LLM_BREAKER_COOLDOWN = float(os.environ.get('LLM_BREAKER_COOLDOWN', 30))
+# A quarter of a gunicorn worker's request threads (GUNICORN_THREADS): a
+# hung provider fills the bulkhead, and the other threads keep serving CRUD
+LLM_MAX_IN_FLIGHT = int(os.environ.get('LLM_MAX_IN_FLIGHT', int(os.environ.get('GUNICORN_THREADS', 256)) // 4))
+# How long a call may queue for a bulkhead slot before it is rejected (503);
+# kept short so waiting callers do not pin request threads either
+LLM_BULKHEAD_WAIT = float(os.environ.get('LLM_BULKHEAD_WAIT', 0.25))
+LLM_HEDGE_KINDS = {kind for kind in os.environ.get('LLM_HEDGE_KINDS', '').split(',') if kind}
+LLM_HEDGE_PERCENTILE = float(os.environ.get('LLM_HEDGE_PERCENTILE', 0.95))
+# Most extra calls hedging may add, as a share of hedgeable calls
+LLM_HEDGE_BUDGET = float(os.environ.get('LLM_HEDGE_BUDGET', 0.1))
+# Latency samples needed before a kind is hedged at all
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get('LLM_HEDGE_MIN_SAMPLES', 20))
+LLM_HEDGE_MIN_DELAY = float(os.environ.get('LLM_HEDGE_MIN_DELAY', 0.05))
+
+# HTTP statuses and exception names (google.api_core, httpx, grpc) that
+# mean "try again", matched by name so no provider package is imported
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+TRANSIENT_NAMES = {
+    'ResourceExhausted', 'ServiceUnavailable', 'InternalServerError', 'DeadlineExceeded', 'TooManyRequests',
+    'GatewayTimeout', 'BadGateway', 'Aborted', 'ConnectError', 'ReadTimeout', 'RemoteProtocolError',
+}
+
+
+class LLMUnavailable(Exception):
+    """The LLM cannot be called right now; ``retry_after`` is a hint in seconds."""
+    retry_after = None
+
+
+class CircuitOpen(LLMUnavailable):
+    def __init__(self, retry_after):
+        super().__init__(f"LLM calls suspended after repeated failures; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class BulkheadFull(LLMUnavailable):
+    retry_after = 1
+
+
+class LLMTimeout(DeadlineExceeded):
+    """A single LLM call (with its retries) passed its deadline."""
+
+
+def is_transient(error):
+    if isinstance(error, (LLMTimeout, TimeoutError, ConnectionError)):
+        return True
+    for attr in ('code', 'status_code'):
+        status = getattr(error, attr, None)
+        if isinstance(status, int) and status in TRANSIENT_STATUSES:
+            return True
+    return type(error).__name__ in TRANSIENT_NAMES
+
+
+def backoff_delay(attempt, base=LLM_BACKOFF_BASE, cap=LLM_BACKOFF_MAX):
+    """Full jitter: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Opens when recent attempts fail too often; closed/open/half-open."""
+
+    def __init__(self, window=LLM_BREAKER_WINDOW, min_calls=LLM_BREAKER_MIN_CALLS,
+                 error_rate=LLM_BREAKER_ERROR_RATE, cooldown=LLM_BREAKER_COOLDOWN, clock=time.monotonic):
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = 'closed'
+        self._outcomes = deque()
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpen unless a call may go ahead now."""
+        with self._lock:
+            if self.state == 'closed':
+                return
+            remaining = self._opened_at + self.cooldown - self.clock()
+            if self.state == 'open' and remaining <= 0:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._probing:
+                self._probing = True
+                return
+            metrics.incr('llm.circuit_rejections')
+            raise CircuitOpen(max(remaining, 1))
+
+    def record(self, ok):
+        with self._lock:
+            now = self.clock()
+            if self.state == 'half_open' and self._probing:
+                self._probing = False
+                if ok:
+                    self.state = 'closed'
+                    self._outcomes.clear()
+                    logger.info("LLM circuit closed")
+                else:
+                    self._open(now)
+                return
+
+            self._outcomes.append((now, ok))
+            while self._outcomes and self._outcomes[0][0] < now - self.window:
+                self._outcomes.popleft()
+            if self.state == 'closed' and len(self._outcomes) >= self.min_calls:
+                failures = sum(1 for _, outcome in self._outcomes if not outcome)
+                if failures / len(self._outcomes) >= self.error_rate:
+                    self._open(now)
+
+    def _open(self, now):
+        self.state = 'open'
+        self._opened_at = now
+        self._outcomes.clear()
+        metrics.incr('llm.circuit_opened')
+        logger.warning(f"LLM circuit opened for {self.cooldown:.0f}s")
+
+
+class LatencyTracker:
+    """Percentiles over the most recent ``size`` samples."""
+
+    def __init__(self, size=200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+
+class HedgeBudget:
+    """Token bucket: each call earns ``ratio`` of a hedge, up to ``burst``."""
+
+    def __init__(self, ratio=LLM_HEDGE_BUDGET, burst=10):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.burst)
+
+    def spend(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class ResilientLLM:
+    """Wraps a LangChain chat model; ``for_kind`` picks the deadline.
+
+    ``invoke``, ``stream`` and ``batch`` mirror the chat model's methods so
+    the wrapper can be passed wherever the model was (e.g. LLMCache).
+    """
+
+    def __init__(self, llm, deadlines=None, max_retries=LLM_MAX_RETRIES, breaker=None,
+                 max_in_flight=LLM_MAX_IN_FLIGHT, bulkhead_wait=LLM_BULKHEAD_WAIT,
+                 hedge_kinds=LLM_HEDGE_KINDS, hedge_budget=None):
+        self.llm = llm
+        self.deadlines = {**LLM_DEADLINES, **(deadlines or {})}
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker()
+        self.max_in_flight = max_in_flight
+        self.bulkhead_wait = bulkhead_wait
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+        self.hedge_kinds = set(hedge_kinds)
+        self.hedge_budget = hedge_budget or HedgeBudget()
+        self._latencies = {}
+
+    def for_kind(self, kind):
+        return _KindView(self, kind)
+
+    def _get_executor(self):
+        # One thread per bulkhead slot, so submitted attempts never queue.
+        # Threads do not survive fork, so each worker process builds its own.
+        with self._executor_lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='llm-call')
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _start(self, fn, deadline_at):
+        """Run ``fn`` in a bulkhead slot; returns its future."""
+        wait = max(deadline_at - time.monotonic(), 0)
+        if self.bulkhead_wait is not None:
+            wait = min(wait, self.bulkhead_wait)
+        if not self._slots.acquire(timeout=wait):
+            metrics.incr('llm.bulkhead_rejections')
+            raise BulkheadFull(f"Too many LLM calls in flight (limit {self.max_in_flight})")
+        try:
+            self.breaker.before_call()
+            future = self._get_executor().submit(fn)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _deadline_at(self, kind):
+        return time.monotonic() + self.deadlines.get(kind, self.deadlines['default'])
+
+    def _attempts(self, kind, deadline_at, attempt_fn):
+        """Call ``attempt_fn(deadline_at)`` with retries until the deadline."""
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                result = attempt_fn(deadline_at)
+            except LLMUnavailable:
+                raise
+            except Exception as e:
+                # Only failures that say the provider is unhealthy count
+                # against it; a rejected request still got an answer
+                transient = is_transient(e)
+                self.breaker.record(not transient)
+                metrics.incr('llm.errors')
+                if isinstance(e, LLMTimeout):
+                    metrics.incr('llm.timeouts')
+                delay = backoff_delay(attempt)
+                if not transient or attempt >= self.max_retries or time.monotonic() + delay >= deadline_at:
+                    raise
+                attempt += 1
+                metrics.incr('llm.retries')
+                logger.warning(f"Transient LLM error ({kind}), retry {attempt} in {delay:.2f}s: {e}")
+                time.sleep(delay)
+                continue
+            self.breaker.record(True)
+            metrics.observe(f'llm.{kind}.latency_ms', (time.monotonic() - started) * 1000)
+            return result
+
+    def _tracker(self, kind):
+        return self._latencies.setdefault(kind, LatencyTracker())
+
+    def _hedge_delay(self, kind):
+        """Seconds to wait before hedging a call of ``kind``, or None."""
+        if kind not in self.hedge_kinds:
+            return None
+        self.hedge_budget.earn()
+        tracker = self._tracker(kind)
+        if len(tracker) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return max(tracker.percentile(LLM_HEDGE_PERCENTILE), LLM_HEDGE_MIN_DELAY)
+
+    def _call(self, prompt, kind, deadline_at):
+        """Start one ``llm.invoke``; its latency feeds the kind's tracker."""
+        started = time.monotonic()
+        future = self._start(lambda: self.llm.invoke(prompt), deadline_at)
+
+        def track(done):
+            # Every call that completes is sampled, including abandoned
+            # ones, so hedging does not hide the tail it is reacting to
+            if not done.cancelled() and done.exception() is None:
+                self._tracker(kind).add(time.monotonic() - started)
+
+        future.add_done_callback(track)
+        return future
+
+    def invoke(self, prompt, kind='default'):
+        def attempt(deadline_at):
+            futures = [self._call(prompt, kind, deadline_at)]
+            hedge_after = self._hedge_delay(kind)
+            if hedge_after is not None:
+                done, _ = wait(futures, timeout=min(hedge_after, max(deadline_at - time.monotonic(), 0)))
+                if not done and time.monotonic() < deadline_at:
+                    if not self.hedge_budget.spend():
+                        metrics.incr(f'llm.{kind}.hedge.over_budget')
+                    else:
+                        try:
+                            futures.append(self._call(prompt, kind, deadline_at))
+                            metrics.incr(f'llm.{kind}.hedge.fired')
+                        except LLMUnavailable:
+                            pass
+
+            # First successful answer wins; fail only when every call failed
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=max(deadline_at - time.monotonic(), 0),
+                                     return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                winner = next((f for f in futures if f in done and f.exception() is None), None)
+                if winner is not None:
+                    for future in pending:
+                        future.cancel()
+                    if winner is not futures[0]:
+                        metrics.incr(f'llm.{kind}.hedge.won')
+                    return winner.result()
+                if not pending:
+                    raise futures[0].exception()
+            raise LLMTimeout(f"LLM {kind} call exceeded its {self.deadlines.get(kind)}s deadline")
+
+        metrics.incr('llm.calls')
+        return self._attempts(kind, self._deadline_at(kind), attempt)
+
+    def stream(self, prompt, kind='default'):
+        """Yield chunks; the deadline applies to the whole stream.
+
+        Only a stream that has not produced a chunk yet is retried.
+        """
+        done = object()
+        current = {}
+
+        def first_chunk(deadline_at):
+            chunks = queue.Queue()
+
+            def pump():
+                try:
+                    for chunk in self.llm.stream(prompt):
+                        chunks.put(chunk)
+                    chunks.put(done)
+                except Exception as e:
+                    chunks.put(e)
+
+            self._start(pump, deadline_at)
+            current['chunks'] = chunks
+            return self._next(chunks, deadline_at, kind)
+
+        metrics.incr('llm.calls')
+        deadline_at = self._deadline_at(kind)
+        chunk = self._attempts(kind, deadline_at, first_chunk)
+        while chunk is not done:
+            yield chunk
+            chunk = self._next(current['chunks'], deadline_at, kind)
+
+    def _next(self, chunks, deadline_at, kind):
+        try:
+            item = chunks.get(timeout=max(deadline_at - time.monotonic(), 0))
+        except queue.Empty:
+            raise LLMTimeout(f"LLM {kind} stream exceeded its {self.deadlines.get(kind)}s deadline") from None
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def batch(self, prompts, config=None, return_exceptions=False, kind='default'):
+        """``invoke`` for each prompt, ``config["max_concurrency"]`` at a time."""
+        max_concurrency = (config or {}).get('max_concurrency') or len(prompts) or 1
+
+        def call(prompt):
+            try:
+                return self.invoke(prompt, kind)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return e
+
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(prompts) or 1)) as pool:
+            return list(pool.map(call, prompts))
+
+
+class _KindView:
+    """A ResilientLLM with the call kind fixed."""
+
+    def __init__(self, resilient, kind):
+        self._resilient = resilient
+        self.kind = kind
+
+    @property
+    def deadline(self):
+        """Seconds a call of this kind may take."""
+        deadlines = self._resilient.deadlines
+        return deadlines.get(self.kind, deadlines['default'])
+
+    def invoke(self, prompt):
+        return self._resilient.invoke(prompt, self.kind)
+
+    def stream(self, prompt):
+        return self._resilient.stream(prompt, self.kind)
+
+    def batch(self, prompts, config=None, return_exceptions=False):
+        return self._resilient.batch(prompts, config, return_exceptions, self.kind)
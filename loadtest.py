@@ -0,0 +1,106 @@
+"""Check that slow LLM requests do not hold up the CRUD endpoints.
+
+Start the server with the stub LLM answering after a fixed delay, e.g.
+
+    LLM_PROVIDER=stub LLM_STUB_LATENCY=fixed:3 GUNICORN_WORKERS=1 \\
+        DATABASE_PATH=/tmp/loadtest.db gunicorn main:app
+
+then run ``python loadtest.py``. It signs up a throwaway user and creates
+some tasks. It then times GET /api/tasks on an idle server, and again
+while ``--llm`` extract-title requests (one LLM call each) are in flight.
+The /api/tasks latency should stay flat. Every LLM request should succeed
+in about one stub delay. Only the standard library is used.
+"""
+import json
+import time
+import uuid
+import argparse
+import threading
+import http.cookiejar
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Client:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+        try:
+            with self.opener.open(req, timeout=120) as response:
+                return response.status, json.loads(response.read() or b'null')
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(int(q * len(samples)), len(samples) - 1)]
+    return f"p50 {pick(0.5):.1f} ms, p95 {pick(0.95):.1f} ms, max {samples[-1]:.1f} ms"
+
+
+def time_task_list(client, count, stop=None):
+    """Milliseconds for ``count`` sequential GET /api/tasks (or until ``stop``)."""
+    samples = []
+    while len(samples) < count and not (stop and stop.is_set()):
+        started = time.perf_counter()
+        status, _ = client.request('GET', '/api/tasks')
+        assert status == 200, status
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--llm', type=int, default=200, help='concurrent LLM requests')
+    parser.add_argument('--tasks', type=int, default=50, help='tasks to create first')
+    parser.add_argument('--samples', type=int, default=200, help='idle /api/tasks requests')
+    args = parser.parse_args()
+
+    email, password = f"loadtest-{uuid.uuid4().hex[:8]}@example.com", 'loadtest-password'
+    client = Client(args.url)
+    client.request('POST', '/signup', {'email': email, 'password': password})
+    status, body = client.request('POST', '/login', {'email': email, 'password': password})
+    if not (body or {}).get('success'):
+        raise SystemExit(f"Login failed ({status}): {body}")
+    client.request('POST', '/api/tasks/batch', {'operations': [
+        {'op': 'create', 'task': {'task_title': f"Load test task {i}", 'priority': 'Medium', 'time_required': '1'}}
+        for i in range(args.tasks)
+    ]})
+
+    print(f"idle /api/tasks:        {percentiles(time_task_list(client, args.samples))}")
+
+    def llm_request(i):
+        # Distinct prompts, so the LLM cache cannot coalesce them
+        started = time.perf_counter()
+        status, _ = client.request('POST', '/api/search-task',
+                                   {'query': f"rename load test task {i}", 'extract_title_only': True})
+        return status, time.perf_counter() - started
+
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=args.llm + 1) as pool:
+        started = time.perf_counter()
+        calls = [pool.submit(llm_request, i) for i in range(args.llm)]
+        # Give the LLM requests a moment to be in flight
+        time.sleep(0.2)
+        busy = pool.submit(time_task_list, client, 10 ** 6, stop)
+        results = [call.result() for call in calls]
+        stop.set()
+        elapsed = time.perf_counter() - started
+
+    print(f"with {args.llm} LLM requests: {percentiles(busy.result())}")
+    failed = [status for status, _ in results if status != 200]
+    slowest = max(seconds for _, seconds in results)
+    print(f"LLM requests: {len(results) - len(failed)} ok, {len(failed)} failed {sorted(set(failed))}, "
+          f"slowest {slowest:.1f} s, all done in {elapsed:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,7 @@
 
+import jobs
 from app import app
 
 if __name__ == '__main__':
+    jobs.start()
     app.run(host='0.0.0.0', port=5000, debug=True)
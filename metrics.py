@@ -0,0 +1,33 @@
+"""Process-local counters and timings exposed through ``/api/metrics``.
+
+Counters are per worker process; aggregate across workers when reading them.
+"""
+import threading
+from collections import Counter
+
+_lock = threading.Lock()
+_counters = Counter()
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+def observe(name, value):
+    """Record one sample of a timing/size: keeps count, sum and max."""
+    with _lock:
+        _counters[f'{name}.count'] += 1
+        _counters[f'{name}.sum'] += value
+        _counters[f'{name}.max'] = max(_counters[f'{name}.max'], value)
+
+
+def get(name):
+    with _lock:
+        return _counters[name]
+
+
+def snapshot(prefix=''):
+    with _lock:
+        return {name: value for name, value in sorted(_counters.items())
+                if name.startswith(prefix)}
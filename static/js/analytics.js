@@ -3,6 +3,14 @@
 let completionChart = null;
 let priorityChart = null;
 let tagChart = null;
+let trendChart = null;
+let tagTrendChart = null;
+
+// Days covered by each trend granularity
+const TREND_RANGE_DAYS = {
+    day: 30,
+    week: 84
+};
 
 function loadAnalyticsData() {
     fetch('/api/analytics')
@@ -17,6 +25,41 @@ function loadAnalyticsData() {
         .catch(error => {
             console.error('Error fetching analytics data:', error);
         });
+
+    loadTrendData();
+}
+
+function loadTrendData() {
+    const select = document.getElementById('trendGranularity');
+    const granularity = select ? select.value : 'day';
+    const to = new Date();
+    const from = new Date(to);
+    from.setDate(to.getDate() - TREND_RANGE_DAYS[granularity] + 1);
+
+    const params = new URLSearchParams({
+        granularity: granularity,
+        from: toIsoDate(from),
+        to: toIsoDate(to)
+    });
+    fetch(`/api/analytics/timeseries?${params}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                renderTrendChart(data.timeseries);
+                renderTagTrendChart(data.timeseries);
+            } else {
+                console.error('Error loading trends:', data.message);
+            }
+        })
+        .catch(error => {
+            console.error('Error fetching trend data:', error);
+        });
+}
+
+function toIsoDate(date) {
+    const month = String(date.getMonth() + 1).padStart(2, '0');
+    const day = String(date.getDate()).padStart(2, '0');
+    return `${date.getFullYear()}-${month}-${day}`;
 }
 
 function renderAnalytics(analytics) {
@@ -205,6 +248,116 @@ function renderTagChart(tagData) {
     });
 }
 
+const trendScales = {
+    x: {
+        ticks: {
+            color: '#b0b7c3'
+        },
+        grid: {
+            display: false
+        }
+    },
+    y: {
+        beginAtZero: true,
+        ticks: {
+            color: '#b0b7c3',
+            precision: 0
+        },
+        grid: {
+            color: 'rgba(176, 183, 195, 0.1)'
+        }
+    }
+};
+
+const trendLegend = {
+    position: 'bottom',
+    labels: {
+        color: '#b0b7c3',
+        font: {
+            size: 12
+        }
+    }
+};
+
+function renderTrendChart(timeseries) {
+    const ctx = document.getElementById('trendChart').getContext('2d');
+
+    // Destroy existing chart if it exists
+    if (trendChart) {
+        trendChart.destroy();
+    }
+
+    trendChart = new Chart(ctx, {
+        type: 'line',
+        data: {
+            labels: timeseries.periods,
+            datasets: [
+                { label: 'Created', data: timeseries.series.created, borderColor: '#3498db', backgroundColor: '#3498db', tension: 0.3 },
+                { label: 'Completed', data: timeseries.series.completed, borderColor: '#2ecc71', backgroundColor: '#2ecc71', tension: 0.3 },
+                { label: 'Hours planned', data: timeseries.series.hours_planned, borderColor: '#f39c12', backgroundColor: '#f39c12', borderDash: [5, 5], tension: 0.3, yAxisID: 'hours' },
+                { label: 'Hours completed', data: timeseries.series.hours_completed, borderColor: '#9b59b6', backgroundColor: '#9b59b6', borderDash: [5, 5], tension: 0.3, yAxisID: 'hours' }
+            ]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            scales: {
+                ...trendScales,
+                hours: {
+                    position: 'right',
+                    beginAtZero: true,
+                    ticks: {
+                        color: '#b0b7c3'
+                    },
+                    grid: {
+                        display: false
+                    }
+                }
+            },
+            plugins: {
+                legend: trendLegend
+            }
+        }
+    });
+}
+
+function renderTagTrendChart(timeseries) {
+    const ctx = document.getElementById('tagTrendChart').getContext('2d');
+    const tagColors = {
+        STUDY: '#9b59b6',
+        WORK: '#3498db',
+        READ: '#2ecc71'
+    };
+
+    // Destroy existing chart if it exists
+    if (tagTrendChart) {
+        tagTrendChart.destroy();
+    }
+
+    tagTrendChart = new Chart(ctx, {
+        type: 'bar',
+        data: {
+            labels: timeseries.periods,
+            datasets: Object.entries(timeseries.tags).map(([tag, counts]) => ({
+                label: `${tag} created`,
+                data: counts.created,
+                backgroundColor: tagColors[tag] || '#95a5a6'
+            }))
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            scales: {
+                x: { ...trendScales.x, stacked: true },
+                y: { ...trendScales.y, stacked: true }
+            },
+            plugins: {
+                legend: trendLegend
+            }
+        }
+    });
+}
+
 // Initialize mini calendar for summary
 function initSummaryCalendar() {
     const summaryCalendar = document.getElementById('summaryCalendar');
@@ -276,9 +429,15 @@ function initSummaryCalendar() {
 // Initialize everything when the page loads
 document.addEventListener('DOMContentLoaded', function() {
     initSummaryCalendar();
+
+    const trendGranularity = document.getElementById('trendGranularity');
+    if (trendGranularity) {
+        trendGranularity.addEventListener('change', loadTrendData);
+    }
 });
 
 // Export analytics functions for other modules
 window.AnalyticsUtils = {
-    loadAnalyticsData
+    loadAnalyticsData,
+    loadTrendData
 };
@@ -61,6 +61,11 @@ document.addEventListener('DOMContentLoaded', function() {
         // Setup voice input
         setupVoiceInput();
 
+        const clearCompletedBtn = document.getElementById('clearCompletedBtn');
+        if (clearCompletedBtn) {
+            clearCompletedBtn.addEventListener('click', clearCompletedTasks);
+        }
+
         // Setup sidebar tabs
         const sidebarTabs = document.querySelectorAll('.sidebar-tab');
         const sidebarContents = document.querySelectorAll('.sidebar-content');
@@ -266,19 +271,7 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     async function loadTasks() {
-        try {
-            const response = await fetch('/api/tasks');
-            const data = await response.json();
-
-            if (data.success) {
-                renderTasks(data.tasks);
-            } else {
-                showAlert('Error loading tasks: ' + data.message, 'danger');
-            }
-        } catch (error) {
-            console.error('Error loading tasks:', error);
-            showAlert('Error loading tasks. Please try again.', 'danger');
-        }
+        await window.loadTasks();
     }
 
     function markCompletedTasks() {
@@ -685,12 +678,13 @@ document.addEventListener('DOMContentLoaded', function() {
             const response = await fetch('/api/llm-assistant', {
                 method: 'POST',
                 headers: {
-                    'Content-Type': 'application/json'
+                    'Content-Type': 'application/json',
+                    'Prefer': 'respond-async'
                 },
                 body: JSON.stringify({ prompt: message })
             });
 
-            const data = await response.json();
+            const data = await jobResult(response);
 
             // Handle different intents based on the response
             const intent = data.intent;
@@ -706,11 +700,13 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (data.success && data.task_title) {
                     const taskTitle = data.task_title;
                     console.log("Task title extracted:", taskTitle);
+                    const candidateListId = `taskTitleCandidates${++titleCandidatesCount}`;
                     assistantMessageElement.innerHTML = `
                         <div class="message-content">
                             <p>I found this task. Please confirm the title:</p>
                             <div class="mb-3">
-                                <input type="text" class="form-control" id="extractedTaskTitle" value="${taskTitle}">
+                                <input type="text" class="form-control" id="extractedTaskTitle" value="${taskTitle}" list="${candidateListId}">
+                                ${titleCandidatesList(candidateListId, data.candidates)}
                             </div>
                             <button class="btn btn-primary btn-sm mb-3" id="confirmTitleBtn">
                                 <i data-feather="check"></i> Confirm Title
@@ -847,11 +843,13 @@ document.addEventListener('DOMContentLoaded', function() {
                     const taskTitle = data.task_title;
                     const scheduledDate = data.scheduled_date;
                     console.log("Task title:", taskTitle, "Scheduled date:", scheduledDate);
+                    const candidateListId = `taskTitleCandidates${++titleCandidatesCount}`;
                     assistantMessageElement.innerHTML = `
                         <div class="message-content">
                             <p>I found this task. Please confirm the title and date:</p>
                             <div class="mb-3">
-                                <input type="text" class="form-control" id="extractedTaskTitle" value="${taskTitle}">
+                                <input type="text" class="form-control" id="extractedTaskTitle" value="${taskTitle}" list="${candidateListId}">
+                                ${titleCandidatesList(candidateListId, data.candidates)}
                                 <input type="text" class="form-control mt-2" id="extractedScheduleDate" value="${scheduledDate}">
                             </div>
                             <button class="btn btn-primary btn-sm mb-3" id="confirmTitleBtn">
@@ -877,7 +875,8 @@ document.addEventListener('DOMContentLoaded', function() {
                                 fetch('/api/search-task-date', {
                                     method: 'POST',
                                     headers: {
-                                        'Content-Type': 'application/json'
+                                        'Content-Type': 'application/json',
+                                        'Prefer': 'respond-async'
                                     },
                                     body: JSON.stringify({ 
                                         task_title: updatedTitle,
@@ -885,7 +884,7 @@ document.addEventListener('DOMContentLoaded', function() {
                                         prompt: message
                                     })
                                 })
-                                .then(response => response.json())
+                                .then(jobResult)
                                 .then(data => {
                                     if (data.success && data.task) {
                                         console.log(data.task);
@@ -991,10 +990,48 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
-    async function generateTaskSummary() {
+    function generateTaskSummary() {
+        if (!window.EventSource) {
+            fetchTaskSummary();
+            return;
+        }
+
+        // Stream the summary so text appears as soon as the first tokens arrive
+        const summaryText = document.getElementById('taskSummaryText');
+        const source = new EventSource('/api/task-summary/stream');
+        let received = false;
+
+        source.onmessage = (event) => {
+            const chunk = JSON.parse(event.data);
+            if (!received) {
+                summaryText.textContent = '';
+                received = true;
+            }
+            summaryText.textContent += chunk.text;
+        };
+
+        source.addEventListener('done', () => {
+            source.close();
+            summaryText.textContent = summaryText.textContent.trim();
+        });
+
+        // Covers both server-sent error events and connection failures
+        source.addEventListener('error', () => {
+            source.close();
+            if (!received) {
+                fetchTaskSummary();
+            } else {
+                showAlert('Error generating summary. Please try again.', 'danger');
+            }
+        });
+    }
+
+    async function fetchTaskSummary() {
         try {
-            const response = await fetch('/api/task-summary');
-            const data = await response.json();
+            const response = await fetch('/api/task-summary', {
+                headers: { 'Prefer': 'respond-async' }
+            });
+            const data = await jobResult(response);
 
             if (data.success) {
                 document.getElementById('taskSummaryText').textContent = data.summary;
@@ -1370,13 +1407,114 @@ function renderTasks(tasks) {
     markCompletedTasks();
 }
 
+let titleCandidatesCount = 0;
+
+// Datalist of the stored tasks the server matched an extracted title to,
+// best first, for the title confirmation input
+function titleCandidatesList(listId, candidates) {
+    const options = (candidates || [])
+        .map(candidate => `<option value="${candidate.task_title.replace(/"/g, '&quot;')}"></option>`)
+        .join('');
+    return `<datalist id="${listId}">${options}</datalist>`;
+}
+
+// With "Prefer: respond-async", slow LLM work answers 202 with a background
+// job; wait for it and resolve with its result, which has the same shape as
+// a direct answer
+async function jobResult(response) {
+    const data = await response.json();
+    if (response.status !== 202) {
+        return data;
+    }
+    while (true) {
+        // The server holds each poll until the job finishes or 10s pass
+        const poll = await fetch(`${data.status_url}?wait=10`);
+        const { job } = await poll.json();
+        if (!job) {
+            return { success: false, message: 'Request expired. Please try again.' };
+        }
+        if (job.status === 'succeeded') {
+            return job.result;
+        }
+        if (job.status === 'failed') {
+            return { success: false, message: 'Sorry, something went wrong. Please try again.' };
+        }
+    }
+}
+
+// Client copy of the task list, kept current with /api/tasks/changes
+const taskStore = {
+    version: 0,
+    tasks: new Map()
+};
+
+// Same order as GET /api/tasks: newest first
+function compareTasks(a, b) {
+    if (a.created_at !== b.created_at) {
+        return a.created_at < b.created_at ? 1 : -1;
+    }
+    return b.id - a.id;
+}
+
+function sortedTasks() {
+    return Array.from(taskStore.tasks.values()).sort(compareTasks);
+}
+
+// Insert or move one task's card without re-rendering the lists
+function placeTaskCard(task) {
+    const existing = document.querySelector(`.task-card[data-task-id="${task.id}"]`);
+    if (existing) {
+        existing.remove();
+    }
+
+    const list = document.getElementById(task.completed === 1 ? 'completedTaskList' : 'taskList');
+    const card = createTaskCard(task);
+    const next = Array.from(list.querySelectorAll('.task-card')).find(other => {
+        const otherTask = taskStore.tasks.get(Number(other.getAttribute('data-task-id')));
+        return otherTask && compareTasks(task, otherTask) < 0;
+    });
+    list.insertBefore(card, next || null);
+    if (task.completed === 1) {
+        card.classList.add('completed');
+    }
+}
+
+function applyTaskChanges(data) {
+    if (data.full) {
+        taskStore.tasks.clear();
+    }
+    data.changed.forEach(task => taskStore.tasks.set(task.id, task));
+    data.deleted.forEach(taskId => taskStore.tasks.delete(taskId));
+    taskStore.version = data.version;
+
+    // Placeholders ("No tasks found...") need the full render to come and go
+    const listsHavePlaceholder = !document.querySelector('#taskList .task-card') ||
+        !document.querySelector('#completedTaskList .task-card');
+    if (data.full || listsHavePlaceholder) {
+        renderTasks(sortedTasks());
+        return;
+    }
+
+    data.deleted.forEach(taskId => {
+        const card = document.querySelector(`.task-card[data-task-id="${taskId}"]`);
+        if (card) {
+            card.remove();
+        }
+    });
+    data.changed.forEach(placeTaskCard);
+    if (!document.querySelector('#taskList .task-card') ||
+        !document.querySelector('#completedTaskList .task-card')) {
+        renderTasks(sortedTasks());
+    }
+}
+
 window.loadTasks = async function() {
     try {
-        const response = await fetch('/api/tasks');
+        const response = await fetch(`/api/tasks/changes?since=${taskStore.version}`);
         const data = await response.json();
 
         if (data.success) {
-            renderTasks(data.tasks);
+            applyTaskChanges(data);
         } else {
             showAlert('Error loading tasks: ' + data.message, 'danger');
         }
@@ -1386,6 +1524,48 @@ window.loadTasks = async function() {
     }
 }
 
+// Apply many create/update/complete/delete operations in one request
+async function submitTaskBatch(operations) {
+    const response = await fetch('/api/tasks/batch', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ operations: operations })
+    });
+    return response.json();
+}
+
+async function clearCompletedTasks() {
+    const cards = document.querySelectorAll('#completedTaskList .task-card');
+    if (cards.length === 0) {
+        showAlert('No completed tasks to clear', 'info');
+        return;
+    }
+    if (!confirm(`Delete ${cards.length} completed task(s)?`)) {
+        return;
+    }
+
+    try {
+        const data = await submitTaskBatch(Array.from(cards).map(card => ({
+            op: 'delete',
+            id: Number(card.getAttribute('data-task-id'))
+        })));
+        const deleted = (data.results || []).filter(result => result.success).length;
+        if (deleted > 0) {
+            showAlert(`Deleted ${deleted} completed task(s)`, 'success');
+        }
+        if (!data.success) {
+            showAlert('Some tasks could not be deleted: ' + (data.message || 'see details in the console'), 'warning');
+            console.error('Batch delete results:', data.results);
+        }
+        loadTasks();
+    } catch (error) {
+        console.error('Error clearing completed tasks:', error);
+        showAlert('Error clearing completed tasks. Please try again.', 'danger');
+    }
+}
+
 async function updateTask(taskId, updatedTaskData) {
     try {
         const response = await fetch(`/api/tasks/${taskId}`, {
@@ -0,0 +1,43 @@
+"""Generated daily summaries, cached per user and day.
+
+Each cached summary carries the hash of exactly the task fields its prompt
+was built from, so it stays valid until one of today's tasks changes in a
+way the summary could reflect. A summary whose hash no longer matches is
+still served (stale-while-revalidate) while a background job (see jobs.py)
+generates a fresh one.
+"""
+import json
+import hashlib
+
+import db
+
+# The task columns build_summary_prompt puts into the prompt
+SUMMARY_FIELDS = ('task_title', 'priority', 'description', 'review', 'schedule_from', 'schedule_to')
+
+
+def content_hash(today_tasks, version):
+    """Hash of the prompt inputs; ``version`` is the prompt template's."""
+    rows = [[task[field] for field in SUMMARY_FIELDS] for task in today_tasks]
+    payload = json.dumps([version, rows], separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def lookup(conn, user_id, day):
+    return conn.execute('SELECT prompt_hash, summary FROM summary_cache WHERE user_id = ? AND day = ?',
+                        (user_id, day)).fetchone()
+
+
+def store(user_id, day, prompt_hash, summary):
+    """Save a summary on its own connection (also used outside requests)."""
+    conn = db.open_connection()
+    try:
+        conn.execute('''
+            INSERT OR REPLACE INTO summary_cache (user_id, day, prompt_hash, summary)
+            VALUES (?, ?, ?, ?)
+        ''', (user_id, day, prompt_hash, summary))
+        # Earlier days are never read again
+        conn.execute('DELETE FROM summary_cache WHERE user_id = ? AND day < ?', (user_id, day))
+        conn.commit()
+    finally:
+        conn.close()
+
@@ -0,0 +1,96 @@
+"""Full-text task lookup on the ``tasks_fts`` FTS5 index.
+
+Free text is turned into an FTS5 query of quoted prefix terms that must all
+match ("weekly report" -> ``"weekly"* "report"*``), so a fragment of a word
+still finds the task the way the old ``LIKE '%...%'`` lookups did, and the
+results are ordered by relevance instead of arbitrarily.
+
+Every step costs in proportion to the user's own tasks, not the whole
+table:
+
+- The query is scoped to the user through the indexed ``user_id`` column.
+- Terms are cut to the longest indexed prefix (PREFIX_MAX) so each one is
+  a single prefix-index lookup; the full terms are checked afterwards.
+- Matches are ranked here rather than with bm25(), whose term statistics
+  are gathered over every user's rows on each query.
+"""
+import re
+import unicodedata
+
+# Weight of a query term found in each searchable column: title hits count most
+COLUMN_WEIGHTS = {'task_title': 10.0, 'description': 2.0, 'review': 1.0}
+# Longest prefix the tasks_fts prefix index covers (prefix='2 3 4 5 6')
+PREFIX_MAX = 6
+SEARCH_DEFAULT_LIMIT = 20
+
+
+def _fold(text):
+    # Lower-case and strip diacritics, as the unicode61 tokenizer does
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _terms(text):
+    return re.findall(r'\w+', _fold(text))
+
+
+def fts_query(text, column=None):
+    """FTS5 MATCH expression for free text, or None if it has no words."""
+    terms = _terms(text)
+    if not terms:
+        return None
+    query = ' '.join(f'"{term[:PREFIX_MAX]}"*' for term in terms)
+    return f'{column} : ({query})' if column else query
+
+
+def _score(task, terms, columns):
+    """Weighted count of the columns each term prefixes a word in; None
+    when some term is in none of them."""
+    words = {column: _terms(task[column] or '') for column in columns}
+    score = 0.0
+    for term in terms:
+        hits = [column for column in columns if any(word.startswith(term) for word in words[column])]
+        if not hits:
+            return None
+        score += sum(COLUMN_WEIGHTS[column] for column in hits)
+    return score
+
+
+def search_tasks(conn, user_id, text, limit=SEARCH_DEFAULT_LIMIT, column=None, schedule_date=None):
+    """The user's tasks matching ``text``, best match first.
+
+    ``column`` restricts matching to one indexed column (e.g. task_title);
+    ``schedule_date`` additionally filters on a schedule_date fragment.
+    Ties go to the shorter title, then the newer task.
+    """
+    query = fts_query(text, column)
+    if query is None:
+        return []
+
+    conditions = ['tasks_fts MATCH ?', 'tasks.user_id = ?']
+    params = [f'user_id : "{int(user_id)}" AND ({query})', user_id]
+    if schedule_date:
+        conditions.append('tasks.schedule_date LIKE ?')
+        params.append(f'%{schedule_date}%')
+
+    rows = conn.execute(f'''
+        SELECT tasks.* FROM tasks_fts
+        CROSS JOIN tasks ON tasks.id = tasks_fts.rowid
+        WHERE {" AND ".join(conditions)}
+    ''', params).fetchall()
+
+    terms = _terms(text)
+    columns = [column] if column else list(COLUMN_WEIGHTS)
+    ranked = []
+    for task in rows:
+        score = _score(task, terms, columns)
+        if score is not None:
+            ranked.append((-score, len(_terms(task['task_title'])), -task['id'], task))
+    ranked.sort(key=lambda item: item[:3])
+    return [task for *_, task in ranked[:limit]]
+
+
+def find_task_by_title(conn, user_id, title, schedule_date=None):
+    """Best-ranked task whose title matches ``title``, or None."""
+    rows = search_tasks(conn, user_id, title, limit=1, column='task_title', schedule_date=schedule_date)
+    return rows[0] if rows else None
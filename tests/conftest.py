@@ -0,0 +1,24 @@
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# Set before the app is imported: a throwaway database, the stub LLM and no
+# background job workers unless a test starts them
+_tmp = tempfile.mkdtemp(prefix='mind-mate-tests-')
+os.environ.setdefault('DATABASE_PATH', os.path.join(_tmp, 'tasks.db'))
+os.environ.setdefault('LLM_CACHE_DB', os.path.join(_tmp, 'llm_cache.db'))
+os.environ.setdefault('LLM_PROVIDER', 'stub')
+os.environ.setdefault('JOB_WORKERS', '0')
+
+
+@pytest.fixture
+def client():
+    """A test client signed in as a new user."""
+    from app import app
+    client = app.test_client()
+    credentials = {'email': f"{uuid.uuid4().hex[:12]}@example.com", 'password': 'test-password'}
+    client.post('/signup', json=credentials)
+    assert client.post('/login', json=credentials).json['success']
+    return client
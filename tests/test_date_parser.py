@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pytest
+
+from date_parser import parse_schedule
+
+NOW = datetime(2026, 10, 18, 9, 0)  # a Sunday
+
+
+@pytest.mark.parametrize('text, start, end, hours', [
+    ("gym tomorrow 3-5pm", '15:00', '17:00', '2'),
+    ("add team sync tomorrow 2:30-3pm", '14:30', '15:00', '0.5'),
+    ("schedule standup tomorrow 1:30-2:30pm", '13:30', '14:30', '1'),
+    ("lunch tomorrow 11:30-1pm", '11:30', '13:00', '1.5'),
+    ("call mom tomorrow at 6pm for 1 hour", '18:00', '19:00', '1'),
+])
+def test_time_ranges(text, start, end, hours):
+    parsed = parse_schedule(text, now=NOW)
+    assert parsed.complete
+    assert parsed.fields() == {
+        'schedule_date': '19/10/2026',
+        'schedule_from': start,
+        'schedule_to': end,
+        'time_required': hours,
+    }
+
+
+def test_bare_range_without_meridiem_is_left_to_the_llm():
+    parsed = parse_schedule("gym tomorrow 7-9", now=NOW)
+    assert parsed.schedule_from is None and parsed.schedule_to is None
+
+
+@pytest.mark.parametrize('text', [
+    "finish report by 5pm tomorrow for 2 hours",
+    "submit form before 10am tomorrow for 1 hour",
+])
+def test_deadline_is_not_a_start_time(text):
+    parsed = parse_schedule(text, now=NOW)
+    assert parsed.schedule_from is None
+    assert not parsed.complete
+
+
+def test_ambiguous_next_weekday_is_left_to_the_llm():
+    parsed = parse_schedule("meeting next friday 3-4pm", now=NOW)
+    assert parsed.schedule_date is None
+    assert parsed.schedule_from == '15:00'
+
+
+def test_and_between_two_times_is_not_a_range():
+    parsed = parse_schedule("gym at 5pm and 8pm tomorrow for 1 hour", now=NOW)
+    assert parsed.schedule_from is None and parsed.schedule_to is None
+    assert not parsed.complete
+
+
+def test_and_after_between_is_a_range():
+    parsed = parse_schedule("gym tomorrow between 5 and 6pm", now=NOW)
+    assert (parsed.schedule_from, parsed.schedule_to, parsed.time_required) == ('17:00', '18:00', '1')
+
+
+def test_duration_contradicting_the_range_is_left_to_the_llm():
+    parsed = parse_schedule("gym tomorrow 3-5pm for 1 hour", now=NOW)
+    assert parsed.fields() == {
+        'schedule_date': '19/10/2026',
+        'schedule_from': 'F',
+        'schedule_to': 'F',
+        'time_required': 'F',
+    }
+
+
+def test_duration_matching_the_range():
+    parsed = parse_schedule("gym tomorrow 3-5pm for 2 hours", now=NOW)
+    assert parsed.complete
+    assert parsed.remainder == 'gym'
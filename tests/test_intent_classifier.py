@@ -0,0 +1,41 @@
+import pytest
+
+import intent_classifier
+from intent_classifier import IntentClassifier
+
+
+@pytest.fixture
+def classifier():
+    from app import VOICE_CUES, VOICE_INTENTS
+    return IntentClassifier(VOICE_INTENTS, VOICE_CUES, threshold=0.8)
+
+
+def test_shadow_mode_is_the_default():
+    assert intent_classifier.INTENT_CLASSIFIER_SHADOW
+
+
+@pytest.mark.parametrize('text, label', [
+    ("add gym tomorrow at 5pm", 'CREATE_TASK'),
+    ("please schedule dentist on friday", 'CREATE_TASK'),
+    ("reschedule the gym task to friday", 'UPDATE_TASK'),
+    ("update dentist to 5pm", 'UPDATE_TASK'),
+])
+def test_unambiguous_commands_are_confident(classifier, text, label):
+    prediction = classifier.classify(text)
+    assert prediction.label == label
+    assert classifier.is_confident(prediction)
+
+
+@pytest.mark.parametrize('text', [
+    "add a note to the gym task that it went well",
+    "add a comment on the gym task",
+    "add milk to the shopping task",
+    "mark the gym task as done",
+    "add review to the report task",
+])
+def test_competing_cues_leave_it_to_the_llm(classifier, text):
+    assert not classifier.is_confident(classifier.classify(text))
+
+
+def test_a_name_is_not_a_mark_cue(classifier):
+    assert classifier.classify("call Mark tomorrow at 5pm").label is None
@@ -0,0 +1,20 @@
+import db
+import jobs
+
+
+def test_start_requeues_jobs_whose_worker_died(monkeypatch):
+    import app  # registers the job handlers
+    conn = db.open_connection()
+    job = jobs.enqueue(conn, 1, 'task_summary', {}, 'test-start')
+    conn.execute("UPDATE jobs SET status = 'running', attempts = 1, lease_owner = 'gone', lease_expires_at = 0 "
+                 "WHERE id = ?", (job['id'],))
+    conn.commit()
+
+    started = []
+    monkeypatch.setattr(jobs, 'ensure_workers', started.append)
+    jobs.start(count=2)
+
+    row = jobs.get(conn, 1, job['id'])
+    conn.close()
+    assert row['status'] == 'queued' and row['lease_owner'] is None
+    assert started == [2]
@@ -0,0 +1,87 @@
+"""The LLM response cache: what it stores and how long callers wait on it."""
+import threading
+import time
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from llm_cache import LLMCache, cache_key
+from llm_exec import DeadlineExceeded
+
+
+class CountingLLM:
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        return AIMessage(content=self.content)
+
+    def batch(self, prompts, config=None, return_exceptions=False):
+        return [self.invoke(prompt) for prompt in prompts]
+
+
+def is_label(response):
+    return response.content in ('CREATE_TASK', 'UPDATE_TASK')
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(path=str(tmp_path / 'llm_cache.db'))
+
+
+@pytest.mark.parametrize('content, calls', [('CREATE_TASK', 1), ('Sure! It is CREATE_TASK.', 2)])
+def test_invoke_caches_only_valid_answers(cache, content, calls):
+    llm = CountingLLM(content)
+    for _ in range(2):
+        assert cache.invoke(llm, "classify this", 'classify_voice', 1, validate=is_label).content == content
+    assert llm.calls == calls
+
+
+def test_a_validator_that_raises_rejects_the_answer(cache):
+    def fails(response):
+        raise ValueError("not JSON")
+
+    llm = CountingLLM("{")
+    cache.invoke(llm, "extract this", 'extract_task', 1, validate=fails)
+    cache.invoke(llm, "extract this", 'extract_task', 1, validate=fails)
+    assert llm.calls == 2
+
+
+def test_batch_caches_only_valid_answers(cache):
+    calls = [("one", 'classify_voice', 1, ()), ("two", 'classify_voice', 1, ())]
+    bad = CountingLLM("no label")
+    cache.batch(bad, calls, max_concurrency=2, validate=is_label)
+    good = CountingLLM("UPDATE_TASK")
+    cache.batch(good, calls, max_concurrency=2, validate=is_label)
+    assert good.calls == 2
+
+    cache.batch(good, calls, max_concurrency=2, validate=is_label)
+    assert good.calls == 2
+
+
+def test_waiting_on_another_workers_lease_stops_at_the_deadline(tmp_path):
+    path = str(tmp_path / 'llm_cache.db')
+    holder, waiter = LLMCache(path=path), LLMCache(path=path, lease_seconds=30)
+    key = cache_key("classify this", 'classify_voice', 1)
+    assert holder._acquire_lease(key, 'other worker')
+
+    llm = CountingLLM('CREATE_TASK')
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        waiter.invoke(llm, "classify this", 'classify_voice', 1, deadline=0.3)
+    assert time.monotonic() - started < 1
+    assert llm.calls == 0
+
+
+def test_answer_cached_by_the_lease_holder_is_picked_up(tmp_path):
+    path = str(tmp_path / 'llm_cache.db')
+    holder, waiter = LLMCache(path=path), LLMCache(path=path)
+    key = cache_key("classify this", 'classify_voice', 1)
+    assert holder._acquire_lease(key, 'other worker')
+    threading.Timer(0.2, holder.put, (key, 'UPDATE_TASK')).start()
+
+    llm = CountingLLM('CREATE_TASK')
+    assert waiter.invoke(llm, "classify this", 'classify_voice', 1, deadline=2).content == 'UPDATE_TASK'
+    assert llm.calls == 0
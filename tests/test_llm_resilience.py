@@ -0,0 +1,178 @@
+"""Fault injection against ResilientLLM with the stub provider."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import llm_resilience
+import metrics
+from llm_provider import StubChatModel, StubUnavailable
+from llm_resilience import BulkheadFull, CircuitBreaker, CircuitOpen, LLMTimeout, ResilientLLM
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm_resilience, 'backoff_delay', lambda attempt: 0)
+
+
+def resilient(stub, **kwargs):
+    kwargs.setdefault('breaker', CircuitBreaker(min_calls=100))
+    kwargs.setdefault('hedge_kinds', ())
+    return ResilientLLM(stub, **kwargs)
+
+
+def test_call_within_deadline():
+    llm = resilient(StubChatModel(latency='none'))
+    assert llm.invoke("hello", 'summary').content == "This is a stub response."
+
+
+def test_deadline_stops_waiting_for_a_slow_call():
+    llm = resilient(StubChatModel(latency='fixed:0.5'), deadlines={'classify': 0.1}, max_retries=0)
+    started = time.monotonic()
+    with pytest.raises(LLMTimeout):
+        llm.invoke("hello", 'classify')
+    assert time.monotonic() - started < 0.4
+
+
+def test_transient_errors_are_retried_then_raised():
+    retries = metrics.get('llm.retries')
+    llm = resilient(StubChatModel(latency='none', error_rate=1.0), max_retries=2)
+    with pytest.raises(StubUnavailable):
+        llm.invoke("hello")
+    assert metrics.get('llm.retries') - retries == 2
+
+
+def test_retry_recovers_from_a_transient_error(monkeypatch):
+    # First draw fails the call, the second lets it through
+    draws = iter([0.0, 0.99])
+    monkeypatch.setattr('llm_provider.random.random', lambda: next(draws))
+    llm = resilient(StubChatModel(latency='none', error_rate=0.5), max_retries=2)
+    assert llm.invoke("hello").content == "This is a stub response."
+
+
+def test_breaker_opens_half_opens_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(window=30, min_calls=4, error_rate=0.5, cooldown=10, clock=clock)
+    for ok in (True, False, True, False):
+        breaker.before_call()
+        breaker.record(ok)
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+    # After the cooldown a single probe is let through
+    clock.now = 11
+    breaker.before_call()
+    assert breaker.state == 'half_open'
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+    breaker.record(True)
+    assert breaker.state == 'closed'
+    breaker.before_call()
+
+
+def test_failed_probe_reopens_the_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker(min_calls=2, error_rate=0.5, cooldown=10, clock=clock)
+    breaker.record(False)
+    breaker.record(False)
+    clock.now = 11
+    breaker.before_call()
+    breaker.record(False)
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+
+def test_open_breaker_fails_calls_fast():
+    breaker = CircuitBreaker(min_calls=3, error_rate=0.5, cooldown=60)
+    llm = resilient(StubChatModel(latency='none', error_rate=1.0), breaker=breaker, max_retries=0)
+    for _ in range(3):
+        with pytest.raises(StubUnavailable):
+            llm.invoke("hello")
+    with pytest.raises(CircuitOpen):
+        llm.invoke("hello")
+
+
+def _hold_slot(llm):
+    thread = threading.Thread(target=llm.invoke, args=("hello",))
+    thread.start()
+    time.sleep(0.05)
+    return thread
+
+
+def test_full_bulkhead_rejects_after_its_wait():
+    llm = resilient(StubChatModel(latency='fixed:0.5'), max_in_flight=1, bulkhead_wait=0.05)
+    thread = _hold_slot(llm)
+    with pytest.raises(BulkheadFull):
+        llm.invoke("hello")
+    thread.join()
+
+
+def test_full_bulkhead_queues_until_the_deadline():
+    llm = resilient(StubChatModel(latency='fixed:0.2'), max_in_flight=1, bulkhead_wait=None,
+                    deadlines={'default': 2})
+    thread = _hold_slot(llm)
+    assert llm.invoke("hello").content == "This is a stub response."
+    thread.join()
+
+
+def test_hung_provider_leaves_request_threads_for_crud(client, monkeypatch):
+    import app
+    # Every call outlives its deadline, so its slot stays taken after the
+    # caller gives up; the bulkhead holds half of the 8 "request threads"
+    hung = resilient(StubChatModel(latency='fixed:3'), max_in_flight=4, bulkhead_wait=0.05,
+                     deadlines={'classify': 1, 'extract': 1})
+    monkeypatch.setattr(app, 'llm', hung)
+
+    with ThreadPoolExecutor(max_workers=8) as request_threads:
+        llm_requests = [request_threads.submit(client.post, '/api/search-task',
+                                               json={'query': f"rename task {i}", 'extract_title_only': True})
+                        for i in range(16)]
+        time.sleep(0.2)
+        started = time.monotonic()
+        tasks = request_threads.submit(client.get, '/api/tasks').result()
+        answered_in = time.monotonic() - started
+        statuses = [request.result().status_code for request in llm_requests]
+
+    assert tasks.status_code == 200
+    assert answered_in < 0.5
+    # Calls beyond the bulkhead were turned away at once instead of queueing
+    assert statuses.count(503) == 12
+    assert statuses.count(504) == 4
+
+
+class SlowFirstCall:
+    """The first call hangs past the hedge delay; any later call is quick."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        time.sleep(0.5 if self.calls == 1 else 0)
+        return f"answer {self.calls}"
+
+
+def test_combined_prompt_kind_is_hedged(monkeypatch):
+    import app
+    kind = app.PROMPT_KINDS['classify_extract_voice']
+    monkeypatch.setattr(llm_resilience, 'LLM_HEDGE_MIN_SAMPLES', 1)
+    llm = resilient(SlowFirstCall(), hedge_kinds={kind}, hedge_budget=llm_resilience.HedgeBudget(ratio=1))
+    llm._tracker(kind).add(0.01)
+    won = metrics.get(f'llm.{kind}.hedge.won')
+
+    started = time.monotonic()
+    assert llm.for_kind(kind).invoke("hello") == "answer 2"
+    assert time.monotonic() - started < 0.4
+    assert metrics.get(f'llm.{kind}.hedge.won') - won == 1
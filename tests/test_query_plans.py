@@ -0,0 +1,37 @@
+"""The hot task queries are index searches with no sort step."""
+import pytest
+
+import db
+
+# The queries of GET /api/tasks (plain and keyset-paginated), the daily
+# summary (get_today_tasks) and GET /api/calendar-tasks
+QUERIES = {
+    'list': ('SELECT * FROM tasks WHERE user_id = ? ORDER BY created_at DESC, id DESC', (1,)),
+    'keyset': ('SELECT * FROM tasks WHERE user_id = ? AND (created_at, id) < (?, ?) '
+               'ORDER BY created_at DESC, id DESC LIMIT ?', (1, '2026-10-18 09:00:00', 50, 21)),
+    'summary': ('SELECT * FROM tasks WHERE user_id = ? AND schedule_date = ? '
+                'ORDER BY priority, schedule_from', (1, '18/10/2026')),
+    'calendar': ('SELECT * FROM tasks WHERE user_id = ? AND schedule_iso BETWEEN ? AND ? '
+                 'ORDER BY schedule_iso, schedule_from', (1, '2026-10-01', '2026-10-31')),
+}
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DATABASE', str(tmp_path / 'tasks.db'))
+    db.migrate()
+    conn = db.open_connection()
+    yield conn
+    conn.close()
+
+
+def test_schema_is_current(conn):
+    assert db.schema_version(conn) == len(db.MIGRATIONS)
+
+
+@pytest.mark.parametrize('name', QUERIES)
+def test_query_uses_an_index_without_sorting(conn, name):
+    query, params = QUERIES[name]
+    plan = [row['detail'] for row in conn.execute(f'EXPLAIN QUERY PLAN {query}', params)]
+    assert any(step.startswith('SEARCH tasks USING') and 'INDEX' in step for step in plan), plan
+    assert not any('TEMP B-TREE' in step for step in plan), plan
@@ -0,0 +1,42 @@
+"""/api/tasks/batch validates every item the way the single-task routes do."""
+COMPLETE = {'task_title': "Gym", 'description': '', 'time_required': '1'}
+# No time required and no schedule: validate_task warns about it
+INCOMPLETE = {'task_title': "Call mom", 'description': ''}
+
+
+def batch(client, *operations, **options):
+    return client.post('/api/tasks/batch', json={'operations': list(operations), **options})
+
+
+def titles(client):
+    return [task['task_title'] for task in client.get('/api/tasks').json['tasks']]
+
+
+def test_create_with_warnings_is_not_written(client):
+    response = batch(client, {'op': 'create', 'task': COMPLETE}, {'op': 'create', 'task': INCOMPLETE})
+    first, second = response.json['results']
+    assert first['success'] and first['task']['task_title'] == "Gym"
+    assert not second['success']
+    assert second['status'] == 'needs_confirmation'
+    assert second['warnings']
+    assert response.json['applied'] == 1
+    assert titles(client) == ["Gym"]
+
+
+def test_atomic_batch_with_warnings_writes_nothing(client):
+    response = batch(client, {'op': 'create', 'task': COMPLETE}, {'op': 'create', 'task': INCOMPLETE}, atomic=True)
+    assert response.status_code == 400
+    assert titles(client) == []
+
+
+def test_bool_id_is_not_a_task_id(client):
+    import app
+    # True == 1, so without the check it would address task 1
+    assert not app.is_task_id(True)
+    assert app.is_task_id(1)
+
+    task_id = batch(client, {'op': 'create', 'task': COMPLETE}).json['results'][0]['id']
+    response = batch(client, {'op': 'delete', 'id': True})
+    assert response.json['results'][0]['message'] == "Task not found or not authorized"
+    assert titles(client) == ["Gym"]
+    assert batch(client, {'op': 'delete', 'id': task_id}).json['success']
@@ -0,0 +1,29 @@
+import pytest
+
+
+@pytest.fixture
+def prompts(monkeypatch):
+    import app
+    sent = []
+    invoke_cached = app.invoke_cached
+
+    def recording(prompt, template, volatile=()):
+        sent.append(prompt)
+        return invoke_cached(prompt, template, volatile)
+
+    monkeypatch.setattr(app, 'invoke_cached', recording)
+    return sent
+
+
+def test_combined_prompt_takes_resolved_schedule_from_the_parser(prompts):
+    import app
+    command = app.classify_and_extract("gym tomorrow 5-6pm", app.VOICE_INTENTS, 'classify_extract_voice')
+    assert (command.schedule_from, command.schedule_to, command.time_required) == ('17:00', '18:00', '1')
+    assert 'schedule_date' not in prompts[-1]
+
+
+def test_combined_prompt_asks_for_an_unresolved_schedule(prompts):
+    import app
+    command = app.classify_and_extract("gym sometime soon", app.VOICE_INTENTS, 'classify_extract_voice')
+    assert command.schedule_from == 'F'
+    assert 'schedule_date (DD/MM/YYYY)' in prompts[-1]
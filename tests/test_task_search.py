@@ -0,0 +1,45 @@
+"""Task search matches word fragments within the user's own tasks."""
+import pytest
+
+import db
+from task_search import find_task_by_title, search_tasks
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DATABASE', str(tmp_path / 'tasks.db'))
+    db.migrate()
+    conn = db.open_connection()
+    conn.executemany('INSERT INTO users (id, email, password) VALUES (?, ?, ?)', [(1, 'a', 'p'), (2, 'b', 'p')])
+    conn.executemany('INSERT INTO tasks (user_id, task_title, description) VALUES (?, ?, ?)', [
+        (1, 'Weekly report', 'write the weekly report'),
+        (1, 'Report review for the weekly meeting', ''),
+        (1, 'Café visit', 'groceries after'),
+        (1, 'Groceries', 'buy milk'),
+        (2, 'Weekly report', 'not yours'),
+    ])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def titles(rows):
+    return [row['task_title'] for row in rows]
+
+
+def test_search_only_returns_the_users_tasks(conn):
+    assert all(row['user_id'] == 1 for row in search_tasks(conn, 1, 'weekly report'))
+    assert titles(search_tasks(conn, 2, 'weekly')) == ['Weekly report']
+
+
+def test_fragments_and_long_words_match(conn):
+    assert titles(search_tasks(conn, 1, 'week rep')) == ['Weekly report', 'Report review for the weekly meeting']
+    # Longer than the prefix index: the full word is still checked
+    assert titles(search_tasks(conn, 1, 'grocer')) == ['Groceries', 'Café visit']
+    assert search_tasks(conn, 1, 'groceriesx') == []
+    assert titles(search_tasks(conn, 1, 'cafe')) == ['Café visit']
+
+
+def test_find_task_by_title_matches_titles_only(conn):
+    assert find_task_by_title(conn, 1, 'weekly report')['description'] == 'write the weekly report'
+    assert find_task_by_title(conn, 1, 'milk') is None
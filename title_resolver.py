@@ -0,0 +1,153 @@
+"""Fuzzy resolution of an LLM-extracted title to the user's stored tasks.
+
+The title the LLM extracts from "move my dentist thing to friday" is rarely
+the stored title verbatim. Each user's titles are indexed in memory by
+character trigram; a query is scored against every title sharing a trigram
+with it, by the best of trigram similarity, word-set similarity and word
+containment, and the ranking prefers tasks scheduled near today and tasks
+not yet completed.
+
+A user's index is built on first use and tagged with their change_seq
+(see db.next_change_seq); any task write bumps it, so the next lookup
+rebuilds. Indexes are kept for the most recently active users only, and
+cover a user's most recent TITLE_RESOLVER_MAX_TASKS tasks; callers fall back
+to full-text search (task_search) when nothing recent matches.
+"""
+import os
+import re
+import threading
+from collections import Counter, OrderedDict, namedtuple
+from datetime import date
+
+import db
+
+TITLE_RESOLVER_MAX_USERS = int(os.environ.get('TITLE_RESOLVER_MAX_USERS', 256))
+TITLE_RESOLVER_MAX_TASKS = int(os.environ.get('TITLE_RESOLVER_MAX_TASKS', 5000))
+TITLE_RESOLVER_MIN_SIMILARITY = float(os.environ.get('TITLE_RESOLVER_MIN_SIMILARITY', 0.3))
+TITLE_RESOLVER_CONFIDENCE = float(os.environ.get('TITLE_RESOLVER_CONFIDENCE', 0.8))
+
+# Share of the ranking score given to each signal; they sum to 1
+SIMILARITY_WEIGHT = 0.75
+PROXIMITY_WEIGHT = 0.15
+INCOMPLETE_WEIGHT = 0.10
+# Similarity credited when all query words appear in a title
+CONTAINMENT_WEIGHT = 0.85
+# The runner-up must trail by this much for a match to count as confident
+CONFIDENT_MARGIN = 0.05
+
+# Filler words that say nothing about which task is meant
+STOP_WORDS = {'a', 'an', 'the', 'my', 'to', 'for', 'with', 'of', 'on', 'in', 'at', 'task'}
+
+Candidate = namedtuple('Candidate', ['task_id', 'task_title', 'schedule_date', 'completed', 'similarity', 'score'])
+
+
+def normalize(title):
+    return ' '.join(re.findall(r'\w+', str(title).lower()))
+
+
+def trigrams(text):
+    grams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def words(text):
+    return set(text.split()) - STOP_WORDS
+
+
+def _dice(a, b, shared=None):
+    if not a or not b:
+        return 0.0
+    shared = len(a & b) if shared is None else shared
+    return 2 * shared / (len(a) + len(b))
+
+
+class _UserIndex:
+    def __init__(self, conn, user_id, version, max_tasks):
+        self.version = version
+        self.tasks = {}
+        self.postings = {}
+        rows = conn.execute('''
+            SELECT id, task_title, schedule_date, schedule_iso, completed FROM tasks
+            WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT ?
+        ''', (user_id, max_tasks)).fetchall()
+        for row in rows:
+            text = normalize(row['task_title'])
+            grams = trigrams(text)
+            self.tasks[row['id']] = (row, grams, words(text))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(row['id'])
+
+
+class TitleResolver:
+    def __init__(self, max_users=TITLE_RESOLVER_MAX_USERS, max_tasks=TITLE_RESOLVER_MAX_TASKS,
+                 min_similarity=TITLE_RESOLVER_MIN_SIMILARITY, confidence=TITLE_RESOLVER_CONFIDENCE):
+        self.max_users = max_users
+        self.max_tasks = max_tasks
+        self.min_similarity = min_similarity
+        self.confidence = confidence
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _index(self, conn, user_id):
+        # Read the version first: data read after it is at least as new, so
+        # a concurrent write can only cause an extra rebuild, never a stale hit
+        version = db.current_change_seq(conn, user_id)
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None and index.version == version:
+                self._indexes.move_to_end(user_id)
+                return index
+
+        index = _UserIndex(conn, user_id, version, self.max_tasks)
+        with self._lock:
+            self._indexes[user_id] = index
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        return index
+
+    def resolve(self, conn, user_id, title, k=5, today=None):
+        """Up to ``k`` Candidates for ``title``, best first."""
+        text = normalize(title)
+        query_grams = trigrams(text)
+        if not query_grams:
+            return []
+        query_words = words(text)
+        today = today or date.today()
+        index = self._index(conn, user_id)
+
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(index.postings.get(gram, ()))
+
+        candidates = []
+        for task_id, count in shared.items():
+            row, grams, title_words = index.tasks[task_id]
+            # Every query word appearing in the title ("gym" -> "Gym Workout")
+            # is strong evidence even when the title is much longer
+            contained = len(query_words & title_words) / len(query_words) if query_words else 0.0
+            similarity = max(_dice(query_grams, grams, count), _dice(query_words, title_words),
+                             CONTAINMENT_WEIGHT * contained)
+            if similarity < self.min_similarity:
+                continue
+            proximity = 0.0
+            if row['schedule_iso']:
+                days = abs((date.fromisoformat(row['schedule_iso']) - today).days)
+                proximity = 1 / (1 + days / 7)
+            incomplete = 0.0 if row['completed'] == 1 else 1.0
+            score = (SIMILARITY_WEIGHT * similarity + PROXIMITY_WEIGHT * proximity
+                     + INCOMPLETE_WEIGHT * incomplete)
+            candidates.append(Candidate(task_id, row['task_title'], row['schedule_date'], row['completed'],
+                                        round(similarity, 3), round(score, 3)))
+
+        candidates.sort(key=lambda c: (-c.score, -c.similarity, -c.task_id))
+        return candidates[:k]
+
+    def is_confident(self, candidates):
+        """True when the best candidate is a close match and a clear winner."""
+        if not candidates or candidates[0].similarity < self.confidence:
+            return False
+        return len(candidates) == 1 or candidates[0].score - candidates[1].score >= CONFIDENT_MARGIN
@@ -0,0 +1,58 @@
+"""Split a dictated burst of notes into one candidate per task.
+
+"tomorrow gym at 7, call mom at 6 and finish report by Friday" becomes
+three notes. Sentence ends, semicolons and line breaks always separate
+notes. Commas and "and"/"then"/"also" only do when the next piece opens
+like a new task (an action verb or a scheduling phrase), so lists inside
+one task ("buy milk, eggs and bread") stay together.
+"""
+import os
+import re
+
+# Most notes one voice batch request may carry, split or not
+VOICE_BATCH_MAX_NOTES = int(os.environ.get('VOICE_BATCH_MAX_NOTES', 20))
+
+# Words a new task commonly opens with
+TASK_LEADS = {
+    'add', 'arrange', 'ask', 'attend', 'book', 'buy', 'call', 'cancel', 'check', 'clean', 'cook',
+    'create', 'do', 'draft', 'email', 'file', 'finish', 'fix', 'get', 'go', 'make', 'meet', 'order',
+    'pay', 'pick', 'plan', 'practice', 'practise', 'prepare', 'read', 'remind', 'renew', 'reply',
+    'review', 'run', 'schedule', 'send', 'set', 'ship', 'start', 'study', 'submit', 'text', 'visit',
+    'walk', 'wash', 'watch', 'work', 'write',
+    # Scheduling phrases that open a note ("tomorrow gym at 7")
+    'today', 'tonight', 'tomorrow', 'on', 'next', 'this', 'at', 'from', 'in', 'by',
+    'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday',
+}
+
+_HARD_BREAK = re.compile(r'(?<=[.!?;])\s+|\n+|;\s*')
+_SOFT_BREAK = re.compile(r',\s*(?:and\s+|then\s+|also\s+)*|\s+(?:and\s+then|and\s+also|and|then|also)\s+', re.IGNORECASE)
+_LEAD_IN = re.compile(r"^(?:(?:please|and|then|also|i need to|i have to|i want to|i should|remember to|don't forget to)\s+)+",
+                      re.IGNORECASE)
+
+
+def _opens_task(piece):
+    words = _LEAD_IN.sub('', piece.strip()).split()
+    return bool(words) and words[0].lower().strip(',.') in TASK_LEADS
+
+
+def _split_sentence(sentence):
+    pieces, last = [], 0
+    for match in _SOFT_BREAK.finditer(sentence):
+        rest = sentence[match.end():]
+        # Only break where both sides can stand alone as a note
+        if _opens_task(rest) and sentence[last:match.start()].strip():
+            pieces.append(sentence[last:match.start()])
+            last = match.end()
+    pieces.append(sentence[last:])
+    return pieces
+
+
+def split_transcript(text):
+    """The individual notes in ``text``, in order, stripped of filler."""
+    notes = []
+    for sentence in _HARD_BREAK.split(text):
+        for piece in _split_sentence(sentence):
+            note = _LEAD_IN.sub('', piece.strip()).strip(' ,.;')
+            if note:
+                notes.append(note)
+    return notes